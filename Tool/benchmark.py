@@ -0,0 +1,266 @@
+## This python script benchmarks the stages of the pipeline on synthetic data (refer synthetic_data.py),
+## so that performance regressions can be caught without access to the real datasets.
+#
+## Every benchmark prepares its inputs in a temporary directory (not timed), then runs the stage a
+## few times and records the best and median wall-clock time, and the peak memory allocated by Python
+## and numpy during one more run (tracemalloc). The stages are measured at several data scales:
+##  - granule_cleaning : reading the pixels of the bounding box from the granules of a day (sat_processing.py)
+##  - granule_cache : same as granule_cleaning, with the pixels of the granules read from the granule cache (granule_cache.py)
+##  - ferry_ingestion : parsing an ONC export, grouping the records by day and saving the ferry track (ferry_processing.py)
+##  - read_and_filter : selecting the ferry records of the pass and the satellite pixels around them (validation.py)
+##  - oversampling : bootstrapping the correlation of the satellite and ferry chl-a (validation.py)
+##  - heatmap_<mode> : drawing the pixels of a day on the map and writing the html (validation.py)
+#
+## The results can be saved as json (--output) and compared with the results of an earlier run
+## (--compare), the benchmarks which became slower than the tolerance are reported as regressions.
+#
+## The temporary directory is the working directory and the data root of the pipeline (refer paths.py)
+## while a benchmark runs, so that the stages write their outputs and logs there.
+#
+## Run command : python benchmark.py --scales small,medium --output benchmark.json
+
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import paths
+import synthetic_data
+from schema import typed, write_frame
+
+### Sizes of the synthetic data of every scale
+SCALES = {'small':{'rows':300,'cols':200,'granules':2,'ferry_records':20000,'sat_pixels':500,'ferry_pixels':180},
+          'medium':{'rows':1500,'cols':800,'granules':3,'ferry_records':200000,'sat_pixels':5000,'ferry_pixels':180},
+          'large':{'rows':4000,'cols':1200,'granules':3,'ferry_records':1000000,'sat_pixels':50000,'ferry_pixels':1800}}
+BENCHMARKS = ['granule_cleaning','granule_cache','ferry_ingestion','read_and_filter','oversampling','heatmap_markers','heatmap_heatmap','heatmap_grid']
+DATE = "2018-07-01"
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the stages of the pipeline on synthetic data",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--scales", type=str, default="small,medium", help="Comma separated scales of the synthetic data ({})".format(", ".join(SCALES)))
+    parser.add_argument("--only", type=str, default=None, help="Comma separated benchmarks to run ({})".format(", ".join(BENCHMARKS)))
+    parser.add_argument("--repeat", '-r', type=int, default=3, help="Number of timed runs of every benchmark")
+    parser.add_argument("--output", '-o', type=str, default=None, help="Json file in which the results are saved")
+    parser.add_argument("--compare", type=str, default=None, help="Json file of an earlier run to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown of the best time reported as a regression")
+    args = parser.parse_args(argv)
+    args.scales = args.scales.split(",")
+    args.only = BENCHMARKS if args.only is None else args.only.split(",")
+    for scale in args.scales:
+        if scale not in SCALES:
+            parser.error("unknown scale {}".format(scale))
+    for name in args.only:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+    if args.repeat < 1:
+        parser.error("--repeat has to be at least 1")
+    return args
+
+
+def satellite_day(size,seed=0):
+    ## Filtered satellite pixels of a day around the middle of the ferry route
+    rng = np.random.default_rng(seed)
+    return typed(pd.DataFrame({'date':DATE,'starttime':'18:45:00','endtime':'18:47:59',
+                               'latitude':rng.uniform(48.69,49.0,size),'longitude':rng.uniform(-123.4,-123.1,size),
+                               'chl':rng.lognormal(np.log(2.0),0.4,size)}))
+
+
+def ferry_pass(size,seed=1):
+    ## Ferry records of a satellite pass (one per second)
+    df = synthetic_data.ferry_records(DATE,size,"18:45:00",missing_fraction=0.0,seed=seed)
+    return typed(pd.DataFrame({'Date':DATE,'Time':df.iloc[:,0].str.slice(11,19),'Latitude':df.iloc[:,3],'Longitude':df.iloc[:,5],'chl':df.iloc[:,1]}))
+
+
+def setup_granule_cleaning(workdir,scale,cache=None):
+    from sat_processing import day_output_path, satellite_range_cleaning
+    synthetic_data.write_granules(paths.olci_month("2018","07")+"/01",DATE,scale['granules'],scale['rows'],scale['cols'])
+
+    def run():
+        ## Every granule of the day is read again, without the catalog and the manifest
+        satellite_range_cleaning([("2018","07")],1,None,'csv',None,'force',cache)
+        with open(day_output_path(DATE)) as file:
+            return sum(1 for _ in file)-1
+    if cache is not None:
+        ## The cache is filled by a first run, the timed runs only hit it
+        run()
+    return run,scale['rows']*scale['cols']*scale['granules']
+
+
+def setup_granule_cache(workdir,scale):
+    return setup_granule_cleaning(workdir,scale,workdir+"/granule_cache")
+
+
+def setup_ferry_ingestion(workdir,scale):
+    from ferry_processing import clean_daily_ferry_data
+    from ferry_track import open_track, track_path
+    synthetic_data.write_ferry_export(paths.onc_month("2018","07")+"/export.csv",DATE,scale['ferry_records'])
+
+    def run():
+        ## The names of the files written are not printed
+        with open(os.devnull,'w') as devnull, contextlib.redirect_stdout(devnull):
+            clean_daily_ferry_data("2018","07",'csv')
+        return len(open_track(track_path("2018","07")).epoch)
+    return run,scale['ferry_records']
+
+
+def setup_read_and_filter(workdir,scale):
+    import spatial_index
+    import validation
+    from ferry_track import open_track, write_track
+    satellite = workdir+"/filtered_nc_{}.csv".format(DATE)
+    write_frame(satellite_day(scale['sat_pixels']*10),satellite)
+    write_track(ferry_pass(scale['ferry_pixels']),workdir+"/track")
+    track = open_track(workdir+"/track")
+
+    def run():
+        ## The spatial index of the day is built again by every run
+        spatial_index._cache.clear()
+        return sum(len(s) for _,_,s,_,_,_,_ in validation.read_and_filter(satellite,track,2))
+    return run,scale['sat_pixels']*10
+
+
+def setup_oversampling(workdir,scale):
+    import validation
+    s = satellite_day(scale['sat_pixels'])
+    f = ferry_pass(scale['ferry_pixels'])
+
+    def run():
+        corr,sample = validation.oversampling(s,f,200,np.random.default_rng(0))
+        return len(corr)
+    return run,scale['sat_pixels']
+
+
+def setup_heatmap(mode):
+    def setup(workdir,scale):
+        import validation
+        s = satellite_day(scale['sat_pixels'])
+
+        def run():
+            ## The map is rendered to html, as when it is saved
+            map_ferry = validation.heatmap(s,None,48.85,-123.25,0.4,None,'blue',mode)
+            return len(map_ferry.get_root().render())
+        return run,scale['sat_pixels']
+    return setup
+
+
+SETUPS = {'granule_cleaning':setup_granule_cleaning,
+          'granule_cache':setup_granule_cache,
+          'ferry_ingestion':setup_ferry_ingestion,
+          'read_and_filter':setup_read_and_filter,
+          'oversampling':setup_oversampling,
+          'heatmap_markers':setup_heatmap('markers'),
+          'heatmap_heatmap':setup_heatmap('heatmap'),
+          'heatmap_grid':setup_heatmap('grid')}
+
+
+def run_benchmark(name,scale_name,repeat=3):
+    '''
+
+    Parameters:
+        name (str) : name of the benchmark
+        scale_name (str) : scale of the synthetic data
+        repeat (int) : number of timed runs
+
+    Return:
+        result (dict) : best and median wall-clock time (s), peak traced memory (MB), rows given to
+                        the stage and returned by it
+
+    '''
+
+    workdir = tempfile.mkdtemp(prefix="benchmark_")
+    cwd = os.getcwd()
+    roots = (paths.DATA_ROOT,paths.OLCI_ROOT,paths.ONC_ROOT)
+    try:
+        os.chdir(workdir)
+        paths.set_roots(workdir,workdir+"/OLCI",workdir+"/Ferry_ONC")
+        run,rows_in = SETUPS[name](workdir,SCALES[scale_name])
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows_out = run()
+            times.append(time.perf_counter()-start)
+        ## Tracing the allocations slows the stages down, the memory is measured by a separate run
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        paths.set_roots(*roots)
+        os.chdir(cwd)
+        shutil.rmtree(workdir,ignore_errors=True)
+    return {'benchmark':name,'scale':scale_name,'best_s':min(times),'median_s':statistics.median(times),
+            'peak_mb':peak/1024.0/1024.0,'rows_in':int(rows_in),'rows_out':int(rows_out),'repeat':repeat}
+
+
+def compare(results,baseline,tolerance=0.25):
+    '''
+
+    Parameters:
+        results (list of dicts) : results of this run (refer run_benchmark)
+        baseline (list of dicts) : results of an earlier run
+        tolerance (float) : relative slowdown of the best time reported as a regression
+
+    Return:
+        regressions (list of str) : description of every benchmark slower than the tolerance
+
+    '''
+
+    earlier = {(entry['benchmark'],entry['scale']):entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = earlier.get((entry['benchmark'],entry['scale']))
+        if before is None:
+            continue
+        ratio = entry['best_s']/before['best_s'] if before['best_s'] > 0 else 1.0
+        if ratio > 1.0+tolerance:
+            regressions.append("{} ({}) : {:.3f} s -> {:.3f} s (x{:.2f})".format(entry['benchmark'],entry['scale'],before['best_s'],entry['best_s'],ratio))
+    return regressions
+
+
+def main(argv=None):
+    '''
+
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        status (int) : exit status, 1 if a benchmark regressed
+
+    '''
+
+    args = get_args(argv)
+    results = []
+    print("{:<18} {:<8} {:>10} {:>10} {:>10} {:>10} {:>10}".format("benchmark","scale","best (s)","median (s)","peak (MB)","rows in","rows out"))
+    for scale_name in args.scales:
+        for name in args.only:
+            result = run_benchmark(name,scale_name,args.repeat)
+            results.append(result)
+            print("{:<18} {:<8} {:>10.4f} {:>10.4f} {:>10.1f} {:>10} {:>10}".format(name,scale_name,result['best_s'],result['median_s'],
+                                                                                   result['peak_mb'],result['rows_in'],result['rows_out']))
+            sys.stdout.flush()
+    if args.output is not None:
+        with open(args.output,'w') as file:
+            json.dump(results,file,indent=1)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            regressions = compare(results,json.load(file),args.tolerance)
+        for regression in regressions:
+            print("Regression : "+regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+## This python script resamples the satellite and ferry chl-a estimates with numpy to find the
+## distribution of their correlation.
+#
+## Instead of drawing one pandas sample per iteration, the indices of all the iterations are drawn
+## at once from a seeded numpy Generator as a matrix (iterations x sample size) and the Pearson
+## correlation of every row is computed in one vectorized pass. The iterations are processed in
+## batches so that the index matrix stays small even for thousands of iterations.
+
+
+import numpy as np
+
+BATCH_ELEMENTS = 2**22 # maximum number of elements of the index matrix of a batch
+
+
+def pearson_rows(X,Y):
+    '''
+
+    Parameters:
+        X (2D numpy array) : samples, one row per iteration
+        Y (1D or 2D numpy array) : samples paired with the columns of X (same for every row if 1D)
+
+    Return:
+        corr (numpy array) : Pearson correlation of every row (nan if a row is constant)
+
+    '''
+
+    X = X - X.mean(axis=1,keepdims=True)
+    Y = Y - Y.mean(axis=-1,keepdims=True)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        return (X*Y).sum(axis=1)/np.sqrt((X*X).sum(axis=1)*(Y*Y).sum(axis=-1))
+
+
+def _batches(n_boot,sample_size):
+    batch = max(1,BATCH_ELEMENTS//max(1,sample_size))
+    for start in range(0,n_boot,batch):
+        yield min(batch,n_boot-start)
+
+
+def bootstrap_oversampling(sat_chl,ferry_chl,n_boot=200,rng=None):
+    '''
+
+    Parameters:
+        sat_chl (numpy array) : chl-a estimates of the filtered satellite pixels
+        ferry_chl (numpy array) : chl-a estimates of the filtered ferry records
+        n_boot (int) : number of iterations
+        rng (numpy Generator) : random generator, a generator seeded with 0 if None
+
+    Return:
+        corr (numpy array) : correlation of every iteration between the ferry records and as many
+                             satellite pixels drawn with replacement
+        last_idx (numpy array) : positions of the satellite pixels drawn in the last iteration
+
+    '''
+
+    rng = np.random.default_rng(0) if rng is None else rng
+    sat_chl = np.asarray(sat_chl,dtype=np.float64)
+    ferry_chl = np.asarray(ferry_chl,dtype=np.float64)
+    corr = []
+    idx = np.empty((0,len(ferry_chl)),dtype=np.int64)
+    for batch in _batches(n_boot,len(ferry_chl)):
+        idx = rng.integers(0,len(sat_chl),size=(batch,len(ferry_chl)))
+        corr.append(pearson_rows(sat_chl[idx],ferry_chl))
+    corr = np.concatenate(corr) if corr else np.empty(0)
+    last_idx = idx[-1] if len(idx) else np.empty(0,dtype=np.int64)
+    return corr,last_idx
+
+
+def bootstrap_undersampling(sat_chl,ferry_chl,n_boot=10,rng=None):
+    '''
+
+    Parameters:
+        sat_chl (numpy array) : chl-a estimates of the filtered satellite pixels
+        ferry_chl (numpy array) : chl-a estimates of the filtered ferry records
+        n_boot (int) : number of iterations
+        rng (numpy Generator) : random generator, a generator seeded with 0 if None
+
+    Return:
+        corr (numpy array) : correlation of every iteration between the satellite pixels and as many
+                             ferry records drawn without replacement
+
+    '''
+
+    rng = np.random.default_rng(0) if rng is None else rng
+    sat_chl = np.asarray(sat_chl,dtype=np.float64)
+    ferry_chl = np.asarray(ferry_chl,dtype=np.float64)
+    corr = []
+    for batch in _batches(n_boot,len(ferry_chl)):
+        ## Every row of the random matrix is ordered independently, the first positions of
+        ## every row form a sample drawn without replacement
+        idx = np.argsort(rng.random((batch,len(ferry_chl))),axis=1)[:,:len(sat_chl)]
+        corr.append(pearson_rows(ferry_chl[idx],sat_chl))
+    return np.concatenate(corr) if corr else np.empty(0)
+
+
+def summarize(corr,ci=95.0):
+    '''
+
+    Parameters:
+        corr (numpy array) : correlations of the iterations
+        ci (float) : width (%) of the percentile confidence interval
+
+    Return:
+        mean (float) : average correlation (iterations with an undefined correlation are ignored)
+        low (float) : lower bound of the confidence interval
+        high (float) : upper bound of the confidence interval
+
+    '''
+
+    corr = np.asarray(corr,dtype=np.float64)
+    corr = corr[~np.isnan(corr)]
+    if corr.size == 0:
+        return np.nan,np.nan,np.nan
+    low,high = np.percentile(corr,[(100.0-ci)/2.0,100.0-(100.0-ci)/2.0])
+    return float(corr.mean()),float(low),float(high)
@@ -0,0 +1,269 @@
+## This python script stores the processed satellite and ferry datasets in a columnar format
+## (Apache Parquet) as an alternative to the daily csv files.
+#
+## The store is partitioned by dataset, year, month and day:
+##      <root>/<dataset>/year=YYYY/month=MM/day=DD/part-<n>.parquet
+## The coordinates and chlorophyll concentrations are stored as float32 and the time of capture
+## is stored as a timestamp, instead of the 'HH:MM:SS' strings of the csv files. Reading uses the
+## partitions and the statistics of the parquet files to load only the required columns and rows.
+#
+## pyarrow is an optional dependency, it is only required when the parquet format is selected.
+
+
+import glob
+import os
+import numpy as np
+import pandas as pd
+from paths import STORE_DIR, data_path
+from schema import typed
+
+### Datasets kept in the store and their columns
+SATELLITE_DATASETS = ['filtered_nc','sat_filtered','sat_oversampled']
+FERRY_DATASETS = ['clean_ferry','ferry_filtered']
+
+
+def store_root():
+    '''
+
+    Return:
+        root (str) : root directory of the store under the current data root (refer paths.set_roots)
+
+    '''
+
+    return data_path(STORE_DIR)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The parquet format requires pyarrow (pip3 install pyarrow)")
+    return pyarrow
+
+
+def partition_path(root,dataset,date):
+    '''
+
+    Parameters:
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset (for example 'filtered_nc' or 'clean_ferry')
+        date (str) : date of the partition ('YYYY-MM-DD')
+
+    Return:
+        path (str) : directory of the partition
+
+    '''
+
+    year,month,day = date.split("-")
+    return "{}/{}/year={}/month={}/day={}".format(root,dataset,year,month,day)
+
+
+def partition_exists(root,dataset,date):
+    '''
+
+    Parameters:
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset
+        date (str) : date of the partition ('YYYY-MM-DD')
+
+    Return:
+        exists (bool) : True if the partition contains at least one parquet file
+
+    '''
+
+    return len(glob.glob(partition_path(root,dataset,date)+"/*.parquet")) > 0
+
+
+def month_dates(root,dataset,year,month):
+    '''
+
+    Parameters:
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset
+        year (str) : year of the partitions
+        month (str) : month of the partitions
+
+    Return:
+        dates (list of str) : sorted dates ('YYYY-MM-DD') of the partitions of the month holding parquet files
+
+    '''
+
+    dates = []
+    for path in sorted(glob.glob(partition_path(root,dataset,"{}-{}-*".format(year,month)))):
+        if glob.glob(path+"/*.parquet"):
+            dates.append("{}-{}-{}".format(year,month,path.split("day=")[-1]))
+    return dates
+
+
+def to_columnar(df,dataset):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : satellite dataframe (date, starttime, endtime, latitude, longitude, chl)
+                                or ferry dataframe (Date, Time, Latitude, Longitude, chl)
+        dataset (str) : name of the dataset
+
+    Return:
+        table (pandas dataframe) : typed dataframe with float32 coordinates and chl and timestamps
+
+    '''
+
+    if dataset in SATELLITE_DATASETS:
+        table = pd.DataFrame({
+            'starttime':_timestamps(df['date'],df['starttime']),
+            'endtime':_timestamps(df['date'],df['endtime']),
+            'latitude':df['latitude'].astype('float32'),
+            'longitude':df['longitude'].astype('float32'),
+            'chl':df['chl'].astype('float32')})
+    else:
+        table = pd.DataFrame({
+            'time':_timestamps(df['Date'],df['Time']),
+            'Latitude':df['Latitude'].astype('float32'),
+            'Longitude':df['Longitude'].astype('float32'),
+            'chl':df['chl'].astype('float32')})
+    ### Derived columns such as the distance from the ferry (sat_kms) are kept as float32
+    for column in df.columns:
+        if column not in table.columns and column not in ['date','Date','Time'] and pd.api.types.is_numeric_dtype(df[column]):
+            table[column] = df[column].astype('float32').values
+    return table.reset_index(drop=True)
+
+
+def _timestamps(dates,times):
+    ### Times read back from the store are already timestamps, typed frames (refer schema.py) hold
+    ### epoch seconds and times of the csv layout are strings
+    if pd.api.types.is_datetime64_any_dtype(times):
+        return times
+    if isinstance(times.dtype,pd.CategoricalDtype):
+        times = pd.Series(np.asarray(times),index=times.index)
+    if pd.api.types.is_integer_dtype(times):
+        return pd.to_datetime(times,unit='s')
+    return pd.to_datetime(dates.astype(str)+" "+times)
+
+
+def from_columnar(table,dataset,date):
+    '''
+
+    Parameters:
+        table (pandas dataframe) : dataframe read from the store
+        dataset (str) : name of the dataset
+        date (str) : date of the partition ('YYYY-MM-DD')
+
+    Return:
+        df (pandas dataframe) : typed dataframe with the columns used by the csv files (refer schema.py)
+
+    '''
+
+    if dataset in SATELLITE_DATASETS:
+        table.insert(0,'date',date)
+    else:
+        table.insert(0,'Date',date)
+        if 'time' in table.columns:
+            table = table.rename(columns={'time':'Time'})
+    return typed(table)
+
+
+def write_partition(df,root,dataset,date,append=False):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : dataframe in the layout of the csv files
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset
+        date (str) : date of the partition ('YYYY-MM-DD')
+        append (bool) : add a file to the partition instead of replacing it
+
+    Return:
+        path (str) : path of the parquet file written
+
+    '''
+
+    pa = _pyarrow()
+    dirpath = partition_path(root,dataset,date)
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+    existing = sorted(glob.glob(dirpath+"/*.parquet"))
+    if not append:
+        remove_partition(root,dataset,date)
+        existing = []
+    path = "{}/part-{}.parquet".format(dirpath,len(existing))
+    table = pa.Table.from_pandas(to_columnar(df,dataset),preserve_index=False)
+    pa.parquet.write_table(table,path)
+    return path
+
+
+def remove_partition(root,dataset,date):
+    '''
+
+    Parameters:
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset
+        date (str) : date of the partition ('YYYY-MM-DD')
+
+    Return:
+        None
+
+    '''
+
+    for fn in glob.glob(partition_path(root,dataset,date)+"/*.parquet"):
+        os.remove(fn)
+    return None
+
+
+def read_partition(root,dataset,date,columns=None,filters=None):
+    '''
+
+    Parameters:
+        root (str) : root directory of the store
+        dataset (str) : name of the dataset
+        date (str) : date of the partition ('YYYY-MM-DD')
+        columns (list of str) : columns to read, None for every column
+        filters (list of tuples) : (column, operator, value) predicates pushed down to the reader,
+                                   for example [('time','>=',t0),('time','<=',t1)]
+
+    Return:
+        df (pandas dataframe) : rows of the partition matching the filters
+
+    '''
+
+    return read_partition_path(partition_path(root,dataset,date),dataset,columns,filters)
+
+
+def read_partition_path(path,dataset,columns=None,filters=None):
+    '''
+
+    Parameters:
+        path (str) : directory of the partition (<root>/<dataset>/year=YYYY/month=MM/day=DD)
+        dataset (str) : name of the dataset
+        columns (list of str) : columns to read, None for every column
+        filters (list of tuples) : (column, operator, value) predicates pushed down to the reader
+
+    Return:
+        df (pandas dataframe) : rows of the partition matching the filters
+
+    '''
+
+    pa = _pyarrow()
+    parts = dict(part.split("=",1) for part in path.rstrip("/").split("/")[-3:])
+    date = "{}-{}-{}".format(parts['year'],parts['month'],parts['day'])
+    expression = None
+    for column,op,value in (filters or []):
+        predicate = _predicate(pa.dataset.field(column),op,value)
+        expression = predicate if expression is None else expression & predicate
+    table = pa.dataset.dataset(path,format='parquet').to_table(columns=columns,filter=expression).to_pandas()
+    return from_columnar(table,dataset,date)
+
+
+def _predicate(field,op,value):
+    if op == '>=':
+        return field >= value
+    if op == '<=':
+        return field <= value
+    if op == '>':
+        return field > value
+    if op == '<':
+        return field < value
+    if op == '==':
+        return field == value
+    raise ValueError("Unsupported operator {}".format(op))
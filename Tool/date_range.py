@@ -0,0 +1,22 @@
+## This python script expands the date ranges (YYYY-MM to YYYY-MM) given to the processing and
+## validation scripts into the months they cover.
+
+
+def month_range(start,end):
+    '''
+
+    Parameters:
+        start (str) : first month of the range ('YYYY-MM')
+        end (str) : last month of the range ('YYYY-MM')
+
+    Return:
+        months (list of tuples) : (year, month) strings of every month in the range
+
+    '''
+
+    startyear,startmonth = [int(x) for x in start.split("-")]
+    endyear,endmonth = [int(x) for x in end.split("-")]
+    months = []
+    for index in range(startyear*12+startmonth-1,endyear*12+endmonth):
+        months.append((str(index//12),"{:02d}".format(index%12+1)))
+    return months
@@ -1,41 +1,246 @@
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+## This python script plots the distribution (histogram) of the chl-a estimates of the filtered ferry
+## and satellite data points of every day (refer validation.py), and compares the two distributions
+## of the same day side by side.
+#
+## The plots are rendered with the headless Agg backend by a pool of worker processes. Every
+## worker reads the chl-a values of one day at a time, draws them on a figure which is reused for
+## all its plots and only cleared in between, so the memory stays flat for any number of days.
+## matplotlib is only imported when the first plot is drawn.
+
 import os
 import glob
 import argparse
+import functools
+import multiprocessing
+from columnar_store import month_dates, read_partition, store_root
+from date_range import month_range
+from instrumentation import add_arguments, configure, finish, flush, increment, measured, merge_totals, profiled, stage
+from paths import FERRY_DIR, PLOTS_DIR, SATELLITE_DIR, data_path
+from schema import read_frame
+
+MAX_TASKS_PER_CHILD = 200 # plots rendered by a worker process before it is replaced
+PROCESSED_DIRS = {"Ferry":FERRY_DIR,"Satellite":SATELLITE_DIR}
+STORE_DATASETS = {"Ferry":"ferry_filtered","Satellite":"sat_filtered"}
+
+_figures = {}
+
+
+def _pyplot():
+    ## The Agg backend is selected on first use, so importing this script changes no matplotlib setting
+    import matplotlib
+    if not _figures:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="This script takes the arguments from user",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--month","-m",type=str, help = "Type two digits for the desired month such as 07 for july")
+    parser.add_argument("--year","-y",type=int, default=2018, help = "Type the desired year")
+    parser.add_argument("--start",'-s', type=str, help="First month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--end",'-e', type=str, help="Last month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--dataset", "-d", type=str, choices = ["Ferry","Satellite","Comparison"],required=True, help = "Comparison plots the ferry and satellite distributions of the same day side by side")
+    parser.add_argument("--format", "-f", type=str, default="csv", choices = ["csv","parquet"], help = "Format of the filtered data (parquet requires pyarrow)")
+    parser.add_argument("--workers",'-w', type=int, default=1, help="Number of worker processes rendering the plots")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end have to be given together")
+    if args.start is None and args.month is None:
+        parser.error("either --month or --start and --end are required")
+    if args.workers < 1:
+        parser.error("--workers has to be at least 1")
+    return args
+
+
+def filtered_sources(dataset,year,month,data_format='csv'):
+    '''
+
+    Parameters:
+        dataset (str) : 'Ferry' or 'Satellite'
+        year (str) : year of the filtered data
+        month (str) : month of the filtered data
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+
+    Return:
+        sources (dict) : date ('YYYY-MM-DD') -> (name of the plot, csv file path or partition date)
+
+    '''
+
+    if data_format == "parquet":
+        store_dataset = STORE_DATASETS[dataset]
+        return {date:("{}_{}".format(store_dataset,date),date) for date in month_dates(store_root(),store_dataset,year,month)}
+    input_directory = data_path(PROCESSED_DIRS[dataset],year,month)
+    sources = {}
+    for fn in sorted(glob.glob(input_directory+"/*/*_filtered_*.csv")):
+        name = fn.split("/")[-1].split(".")[0]
+        sources[name[-10:]] = (name,fn)
+    return sources
+
+
+def read_chl(dataset,source,data_format='csv'):
+    '''
+
+    Parameters:
+        dataset (str) : 'Ferry' or 'Satellite'
+        source (str) : csv file path, or date of the partition of the columnar store
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+
+    Return:
+        chl (numpy array) : chl-a values of the filtered data points
+
+    '''
+
+    with stage('plot_read') as counts:
+        if data_format == "parquet":
+            ## Only the chl column of the partition is read from the columnar store
+            chl = read_partition(store_root(),STORE_DATASETS[dataset],source,columns=['chl'])['chl'].to_numpy()
+        else:
+            chl = read_frame(source,columns=['chl'])['chl'].to_numpy()
+        counts['rows_out'] = len(chl)
+    return chl
+
+
+def _axes(ncols):
+    ## One figure is kept per layout and cleared before every plot instead of opening a new one
+    if ncols not in _figures:
+        figure,axes = _pyplot().subplots(1,ncols,figsize=(6.4*ncols,4.8),squeeze=False)
+        _figures[ncols] = (figure,axes[0])
+    figure,axes = _figures[ncols]
+    for ax in axes:
+        ax.clear()
+    return figure,axes
+
+
+def draw_histogram(ax,chl,title):
+    '''
+
+    Parameters:
+        ax (matplotlib axes) : axes on which the histogram is drawn
+        chl (numpy array) : chl-a values
+        title (str) : title of the plot
+
+    Return:
+        None
+
+    '''
+
+    ax.hist(chl)
+    ax.axvline(chl.mean(),linestyle="dashed", color='orange')
+    ax.set_title(title)
+    ax.set_xlabel("Chl-a mg/m3")
+    ax.set_ylabel("Frequency")
+    return None
+
+
+def render_plot(task):
+    '''
+
+    Parameters:
+        task (tuple) : (save_at, data_format, panels) of the plot, panels being a list of
+                       (dataset, source, title) drawn side by side
+
+    Return:
+        save_at (str) : path of the saved plot (without extension)
+
+    '''
+
+    save_at,data_format,panels = task
+    figure,axes = _axes(len(panels))
+    for ax,(dataset,source,title) in zip(axes,panels):
+        draw_histogram(ax,read_chl(dataset,source,data_format),title)
+    with stage('plot_render',rows_in=len(panels)):
+        figure.tight_layout()
+        figure.savefig(save_at+".png")
+    return save_at
+
+
+def plot_tasks(dataset,months,data_format='csv'):
+    '''
+
+    Parameters:
+        dataset (str) : 'Ferry', 'Satellite' or 'Comparison'
+        months (list of tuples) : (year, month) of every month to plot
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+
+    Return:
+        tasks (list of tuples) : plots to render (refer render_plot)
+
+    '''
+
+    tasks = []
+    for year,month in months:
+        output_directory = data_path(PLOTS_DIR,dataset,year,month)
+        if dataset == "Comparison":
+            ferry = filtered_sources("Ferry",year,month,data_format)
+            satellite = filtered_sources("Satellite",year,month,data_format)
+            dates = sorted(set(ferry) & set(satellite))
+            for date in dates:
+                panels = [("Ferry",ferry[date][1],"Ferry {}".format(date)),("Satellite",satellite[date][1],"Satellite {}".format(date))]
+                tasks.append((output_directory+"/comparison_{}".format(date),data_format,panels))
+        else:
+            for date,(name,source) in sorted(filtered_sources(dataset,year,month,data_format).items()):
+                tasks.append((output_directory+"/"+name,data_format,[(dataset,source,name)]))
+        if tasks and not os.path.isdir(output_directory):
+            os.makedirs(output_directory)
+    return tasks
+
+
+def render_plots(tasks,workers=1):
+    '''
+
+    Parameters:
+        tasks (list of tuples) : plots to render (refer render_plot)
+        workers (int) : number of worker processes rendering the plots
+
+    Return:
+        None
+
+    '''
+
+    task = functools.partial(measured,render_plot)
+    pool = None
+    if workers > 1:
+        flush()
+        pool = multiprocessing.Pool(processes=workers,maxtasksperchild=MAX_TASKS_PER_CHILD)
+        results = pool.imap_unordered(task,tasks,chunksize=4)
+    else:
+        results = map(task,tasks)
+    try:
+        for save_at,totals in results:
+            merge_totals(totals)
+            increment('plots_rendered')
+            print("created plot : {}.png".format(save_at))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return None
+
+
+def main(argv=None):
+    '''
+
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        None
+
+    '''
+
+    args = get_args(argv)
+    configure('distribution_plots',args.metrics)
+    if args.start is not None:
+        months = month_range(args.start,args.end)
+    else:
+        months = [(str(args.year),args.month)]
+    with profiled(args.profile):
+        render_plots(plot_tasks(args.dataset,months,args.format),args.workers)
+    finish()
+    return None
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--month","-m",type=str, help = "Type two digits for the desired month such as 07 for july", required=True)
-parser.add_argument("--dataset", "-d", type=str, choices = ["Ferry","Satellite"],required=True)
-args = parser.parse_args()
-if args.dataset == "Ferry":
-    processed_dir = "Processed_ferry_to_csv"
-else:
-    processed_dir="Processed_nc_to_csv"
-dataset_ = args.dataset
-month_ = args.month
-input_directory = "{}/{}/2018/{}".format(os.path.dirname(os.getcwd()),processed_dir,month_)
-output_directory = "{}/Distribution_Plots/{}/{}".format(os.path.dirname(os.getcwd()),dataset_,month_)
-# print(input_directory)
-
-
-
-for fn in glob.glob(input_directory+"/*/*_filtered_*.csv"):
-    # print(fn)
-    df = pd.read_csv(fn)
-    out_fn = fn.split("/")[-1].split(".")[0]
-    save_at = output_directory +"/"+ out_fn
-    
-    # print(save_at)
-    chl = np.array(df['chl'])
-    plt.figure()
-    plt.hist(chl)
-    plt.axvline(chl.mean(),linestyle="dashed", color='orange')
-    plt.title(out_fn)
-    plt.xlabel("Chl-a mg/m3")
-    plt.ylabel("Frequency")
-    plt.savefig(save_at+".png")
-
-   
 
+if __name__ == "__main__":
+    main()
@@ -6,68 +6,134 @@ import pandas as pd
 import numpy as np
 import os
 import glob
+import argparse
+from columnar_store import store_root, write_partition
+from ferry_track import track_path, write_track
+from instrumentation import add_arguments, configure, finish, increment, profiled, stage
+from paths import FERRY_DIR, day_dir, day_file, onc_month
+from schema import FERRY_COLUMNS, typed, write_frame
 
-def get_args():
+CHUNK_SIZE = 500000 # records of an ONC export parsed at a time
+
+def get_args(argv=None):
     parser = argparse.ArgumentParser(description="This script takes the arguments from user",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument("--month",'-m', type=str,required=True,choices=['01','02','03','04','05','06','07','08','09','10','11','12'], help="Months (type a desired month number in the range [01,12]")
     parser.add_argument("--year",'-y', type=int, required=True, help="Type the desired year")
-    return parser.parse_args()
+    parser.add_argument("--format",'-f', type=str, default='csv', choices=['csv','parquet'], help="Output format of the daily ferry data (parquet requires pyarrow)")
+    add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def read_ferry_export(fn,chunksize=CHUNK_SIZE):
+
+    '''
+    Parameters:
+        fn (str): path of the csv file exported from the ONC website
+        chunksize (int): number of records parsed at a time
+
+    Return:
+        chunks (iterator of pandas dataframes): cleaned and typed records (Date, Time, Latitude, Longitude, chl), refer schema.py
 
+    '''
+
+    del_row = list(np.arange(50)) # The first 50 lines were containing unnecessary metadata 
+    del_row.append(51)
 
-def clean_daily_ferry_data(year,month):
+    # Only the time, chl-a, latitude and longitude columns are parsed, the rest are redundant
+    reader = iter(pd.read_csv(fn,skiprows = del_row,usecols = [0,1,3,5],chunksize = chunksize))
+    while True:
+        with stage('ferry_read') as counts:
+            data = next(reader,None)
+            if data is not None:
+                # Renaming columns for simplicity
+                data.columns = ['date_time','chl','Latitude','Longitude']
+
+                # Split Date/Time ('YYYY-MM-DDTHH:MM:SS.sssZ') in different columns and organizing columns
+                date_time = data['date_time'].str
+                data['Date'] = date_time.slice(0,10)
+                data['Time'] = date_time.slice(11,19)
+                counts['rows_in'] = len(data)
+                data = typed(data[FERRY_COLUMNS].dropna())
+                counts['rows_out'] = len(data)
+        if data is None:
+            return
+        yield data
+
+
+def clean_daily_ferry_data(year,month,output_format='csv'):
 
     '''
     Parameters:
         year (str): year interested to validate
         month (str): month interested to validate
+        output_format (str): 'csv' for daily csv files or 'parquet' for the columnar store
     
     Return:
-        df (pandas dataframe): aggregated data into one dataframe for the whole month
+        None
 
     '''
     
-    # Cleaning and reading the files
-    df = pd.DataFrame(columns=['Date','Time','Latitude','Longitude','chl'])
-    del_row = list(np.arange(50)) # The first 50 lines were containing unnecessary metadata 
-    del_row.append(51)
-    count = 0
-    for fn in sorted(glob.glob("/spectral/gagan26/Ferry_ONC/{}/{}/*.csv".format(startyear,startmonth))):
-        data = pd.read_csv(fn,skiprows = del_row) # remove unnecessary metadata
-        data.drop(data.columns[[2,4,6,7,8,9,10,11,12]],axis = 1, inplace = True) # Redundant columns
-        count = count +1
-        
-        # Renaming columns for simplicity
-        data.columns = ['date_time','chl','Latitude','Longitude']
-
-        # Split Date/Time in different columns and organizing columns
-        data['Date'] = [x.split('T')[0] for x in data['date_time']]
-        data['Time'] = [x.split('T')[1].split('.')[0] for x in data['date_time']]
-        data = data[['Date','Time','Latitude','Longitude','chl']]
-        data = data.dropna()
-        date_list = data.Date.unique()
-        
-        for date in date_list:
-            day = str(date[8:])
-            date_df = data[data.Date == date]
-                       
-            filepath = "/spectral/gagan26/Processed_ferry_to_csv/{}/{}/{}/clean_ferry_data_{}-{}-{}.csv".format(startyear,startmonth,day,startyear,startmonth,day)
-            dirpath = "../Processed_ferry_to_csv/{}/{}/{}".format(startyear,startmonth,day)
-            if not os.path.isdir("../Processed_ferry_to_csv/{}/{}/{}".format(startyear,startmonth,day)):
-                os.mkdir(dirpath)
-            if not os.path.isfile(filepath):
-                print("created file path : "+filepath)
-                date_df.to_csv(filepath)
-                
-            else:
-                print("updated : "+filepath)
-                date_df.to_csv(filepath,mode = 'a',header = False)
-                
+    # The exports of the month are streamed in chunks and the records are grouped by day. Every
+    # day is written once after all the files are read, so a rerun replaces the daily files
+    # instead of appending duplicate records to them. The records of the month are also saved
+    # as a time-sorted track (refer ferry_track.py).
+    days = {}
+    for fn in sorted(glob.glob(onc_month(year,month)+"/*.csv")):
+        for data in read_ferry_export(fn):
+            for date,date_df in data.groupby('Date',sort=False,observed=True):
+                days.setdefault(date,[]).append(date_df)
+
+    month_df = []
+    for date in sorted(days):
+        date_df = typed(pd.concat(days.pop(date),ignore_index=True))
+        month_df.append(date_df)
+
+        increment('days_written')
+        if output_format == 'parquet':
+            with stage('parquet_write',rows_in=len(date_df)) as counts:
+                print("written to the columnar store : "+write_partition(date_df,store_root(),'clean_ferry',date))
+                counts['rows_out'] = len(date_df)
+            continue
+                   
+        filepath = day_file(FERRY_DIR,'clean_ferry_data',date)
+        dirpath = day_dir(FERRY_DIR,date)
+        if not os.path.isdir(dirpath):
+            os.makedirs(dirpath)
+        print("created file path : "+filepath)
+        with stage('csv_write',rows_in=len(date_df)) as counts:
+            write_frame(date_df,filepath)
+            counts['rows_out'] = len(date_df)
+
+    if month_df:
+        month_df = pd.concat(month_df,ignore_index=True)
+        with stage('track_write',rows_in=len(month_df)) as counts:
+            write_track(month_df,track_path(year,month))
+            counts['rows_out'] = len(month_df)
+        print("created ferry track : "+track_path(year,month))
     return
 
 
-args = get_args()
-month = args.month
-year = str(args.year) 
+def main(argv=None):
+    '''
 
-clean_daily_ferry_data(year,month)
-    
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        None
+
+    '''
+
+    args = get_args(argv)
+    month = args.month
+    year = str(args.year) 
+
+    configure('ferry_processing',args.metrics)
+    with profiled(args.profile):
+        clean_daily_ferry_data(year,month,args.format)
+    finish()
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+## This python script stores the cleaned BC ferry records of a month as a time-sorted track.
+#
+## The track of a month is saved as one numpy array per column (epoch seconds, latitude,
+## longitude and chl-a) sorted by the time of the record. The arrays are opened as memory-mapped
+## files, so the ferry records recorded between two instants (for example the duration of a
+## satellite pass) are found by a binary search (searchsorted) on the epoch array and returned as
+## views of the arrays, without reading or scanning the whole month.
+
+
+import collections
+import os
+import numpy as np
+import pandas as pd
+from paths import TRACK_DIR, data_path
+from schema import to_epoch, typed
+
+TRACK_COLUMNS = ['epoch','latitude','longitude','chl']
+
+FerryTrack = collections.namedtuple('FerryTrack',TRACK_COLUMNS)
+
+
+def track_path(year,month,root=None):
+    '''
+
+    Parameters:
+        year (str) : year of the track
+        month (str) : month of the track
+        root (str) : root directory of the tracks, None for the track directory under the current data root
+
+    Return:
+        path (str) : directory holding the arrays of the track
+
+    '''
+
+    ## The data root is looked up at every call, as it can be changed by paths.set_roots
+    if root is None:
+        root = data_path(TRACK_DIR)
+    return "{}/{}/{}".format(root,year,month)
+
+
+def write_track(df,path):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : ferry records (Date, Time, Latitude, Longitude, chl) of the month
+        path (str) : directory in which the arrays of the track are saved
+
+    Return:
+        None
+
+    '''
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    epoch = to_epoch(df['Date'],df['Time'])
+    order = np.argsort(epoch,kind='stable')
+    columns = {'epoch':epoch,
+               'latitude':df['Latitude'].to_numpy(dtype=np.float64),
+               'longitude':df['Longitude'].to_numpy(dtype=np.float64),
+               'chl':df['chl'].to_numpy(dtype=np.float64)}
+    for name in TRACK_COLUMNS:
+        np.save("{}/{}.npy".format(path,name),columns[name][order])
+    return None
+
+
+def open_track(path):
+    '''
+
+    Parameters:
+        path (str) : directory holding the arrays of the track
+
+    Return:
+        track (FerryTrack) : memory-mapped arrays of the track, None if the track does not exist
+
+    '''
+
+    if not os.path.isfile("{}/epoch.npy".format(path)):
+        return None
+    return FerryTrack(*[np.load("{}/{}.npy".format(path,name),mmap_mode='r') for name in TRACK_COLUMNS])
+
+
+def track_window(track,t0,t1):
+    '''
+
+    Parameters:
+        track (FerryTrack) : track of the month
+        t0 (int) : first instant of the window (epoch seconds, inclusive)
+        t1 (int) : last instant of the window (epoch seconds, inclusive)
+
+    Return:
+        window (FerryTrack) : views of the arrays of the track holding the records of the window
+
+    '''
+
+    start = np.searchsorted(track.epoch,t0,side='left')
+    stop = np.searchsorted(track.epoch,t1,side='right')
+    return FerryTrack(*[column[start:stop] for column in track])
+
+
+def window_frame(window):
+    '''
+
+    Parameters:
+        window (FerryTrack) : records of the track (refer track_window)
+
+    Return:
+        df (pandas dataframe) : typed ferry records (Date, Time, Latitude, Longitude, chl) of the window (refer schema.py)
+
+    '''
+
+    epoch = np.asarray(window.epoch,dtype=np.int64)
+    return typed(pd.DataFrame({'Date':pd.to_datetime(epoch,unit='s').strftime("%Y-%m-%d"),
+                               'Time':epoch,
+                               'Latitude':np.asarray(window.latitude),
+                               'Longitude':np.asarray(window.longitude),
+                               'chl':np.asarray(window.chl)}))
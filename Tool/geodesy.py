@@ -0,0 +1,112 @@
+## This python script computes great-circle and ellipsoidal distances between geographic
+## coordinates with numpy, for many pairs of points in one call.
+#
+## Two methods are available:
+##  - 'haversine' : great-circle distance on a sphere of the mean earth radius (6371.0088 km).
+##                  It is the fastest method, but as the earth is not a sphere the distances differ
+##                  from the geodesic distances on the WGS-84 ellipsoid by up to about 0.6 %
+##                  (about 0.3 % around the Strait of Georgia).
+##  - 'ellipsoidal' : inverse formula of Vincenty on the WGS-84 ellipsoid, solved for all the pairs
+##                  of points at once. The distances agree with the geodesic distances of geopy
+##                  (geopy.distance.distance, Karney's algorithm) to better than 0.1 mm, except for
+##                  nearly antipodal points where the iteration does not converge. The haversine
+##                  distance is returned for those points (never the case for the ferry route).
+
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088 # mean radius of the earth
+WGS84_A = 6378137.0 # semi-major axis (m)
+WGS84_F = 1/298.257223563 # flattening
+WGS84_B = (1-WGS84_F)*WGS84_A # semi-minor axis (m)
+
+
+def haversine(lat1,lon1,lat2,lon2):
+    '''
+
+    Parameters:
+        lat1, lon1 (float or numpy array) : coordinates (degrees) of the first points
+        lat2, lon2 (float or numpy array) : coordinates (degrees) of the second points
+
+    Return:
+        distance (float or numpy array) : great-circle distances (km) between the points
+
+    '''
+
+    lat1,lon1,lat2,lon2 = [np.radians(np.asarray(x,dtype=np.float64)) for x in (lat1,lon1,lat2,lon2)]
+    a = np.sin((lat2-lat1)/2.0)**2 + np.cos(lat1)*np.cos(lat2)*np.sin((lon2-lon1)/2.0)**2
+    return 2.0*EARTH_RADIUS_KM*np.arcsin(np.sqrt(np.clip(a,0.0,1.0)))
+
+
+def vincenty(lat1,lon1,lat2,lon2,max_iter=200,tol=1e-12):
+    '''
+
+    Parameters:
+        lat1, lon1 (float or numpy array) : coordinates (degrees) of the first points
+        lat2, lon2 (float or numpy array) : coordinates (degrees) of the second points
+        max_iter (int) : maximum number of iterations of the longitude on the auxiliary sphere
+        tol (float) : convergence tolerance (radians) of the longitude on the auxiliary sphere
+
+    Return:
+        distance (float or numpy array) : distances (km) between the points on the WGS-84 ellipsoid
+
+    '''
+
+    lat1,lon1,lat2,lon2 = np.broadcast_arrays(*[np.asarray(x,dtype=np.float64) for x in (lat1,lon1,lat2,lon2)])
+    L = np.radians(lon2-lon1)
+    U1 = np.arctan((1-WGS84_F)*np.tan(np.radians(lat1)))
+    U2 = np.arctan((1-WGS84_F)*np.tan(np.radians(lat2)))
+    sinU1,cosU1 = np.sin(U1),np.cos(U1)
+    sinU2,cosU2 = np.sin(U2),np.cos(U2)
+
+    lam = L
+    converged = np.zeros(L.shape,dtype=bool)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam,cos_lam = np.sin(lam),np.cos(lam)
+            sin_sigma = np.sqrt((cosU2*sin_lam)**2 + (cosU1*sinU2 - sinU1*cosU2*cos_lam)**2)
+            cos_sigma = sinU1*sinU2 + cosU1*cosU2*cos_lam
+            sigma = np.arctan2(sin_sigma,cos_sigma)
+            sin_alpha = np.where(sin_sigma==0,0.0,cosU1*cosU2*sin_lam/sin_sigma)
+            cos2_alpha = 1 - sin_alpha**2
+            ## cos2_alpha is 0 for points on the equator
+            cos_2sigma_m = np.where(cos2_alpha==0,0.0,cos_sigma - 2*sinU1*sinU2/cos2_alpha)
+            C = WGS84_F/16*cos2_alpha*(4 + WGS84_F*(4 - 3*cos2_alpha))
+            lam_prev = lam
+            lam = L + (1-C)*WGS84_F*sin_alpha*(sigma + C*sin_sigma*(cos_2sigma_m + C*cos_sigma*(-1 + 2*cos_2sigma_m**2)))
+            converged = np.abs(lam-lam_prev) < tol
+            if converged.all():
+                break
+
+        u2 = cos2_alpha*(WGS84_A**2 - WGS84_B**2)/WGS84_B**2
+        A = 1 + u2/16384*(4096 + u2*(-768 + u2*(320 - 175*u2)))
+        B = u2/1024*(256 + u2*(-128 + u2*(74 - 47*u2)))
+        delta_sigma = B*sin_sigma*(cos_2sigma_m + B/4*(cos_sigma*(-1 + 2*cos_2sigma_m**2)
+                      - B/6*cos_2sigma_m*(-3 + 4*sin_sigma**2)*(-3 + 4*cos_2sigma_m**2)))
+        distance = WGS84_B*A*(sigma - delta_sigma)/1000.0
+
+    if not converged.all():
+        distance = np.where(converged,distance,haversine(lat1,lon1,lat2,lon2))
+    return distance[()] if distance.ndim == 0 else distance
+
+
+def distance_km(lat1,lon1,lat2,lon2,method='ellipsoidal'):
+    '''
+
+    Parameters:
+        lat1, lon1 (float or numpy array) : coordinates (degrees) of the first points
+        lat2, lon2 (float or numpy array) : coordinates (degrees) of the second points, arrays are
+                                            broadcast against each other (for example all the
+                                            satellite pixels against one ferry location)
+        method (str) : 'ellipsoidal' (WGS-84, Vincenty) or 'haversine' (sphere)
+
+    Return:
+        distance (float or numpy array) : distances (km) between the points
+
+    '''
+
+    if method == 'haversine':
+        return haversine(lat1,lon1,lat2,lon2)
+    if method == 'ellipsoidal':
+        return vincenty(lat1,lon1,lat2,lon2)
+    raise ValueError("Unknown distance method {}".format(method))
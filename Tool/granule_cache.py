@@ -0,0 +1,183 @@
+## This python script keeps a local cache of the pixels extracted from the Sentinel-3 granules by
+## sat_processing.py, so that repeated runs over the same months do not decode the netcdf files again
+## from the network storage.
+#
+## Every granule read is saved as a small npz file (latitude, longitude and logchl of the pixels lying
+## inside the bounding box, with the number of pixels and the footprint of the swath). The file is
+## named after a hash of the identity of the granule (path, size, modification time) and of the
+## filter parameters (bounding box and logchl threshold), so a modified granule or another bounding
+## box is read again. The chl-a cap of the daily files is applied after the cache and can be changed
+## without invalidating it.
+#
+## The cache is bounded by its total size on disk : the least recently used extracts (oldest
+## modification time, refreshed on every hit) are deleted once the size is exceeded.
+
+
+import hashlib
+import json
+import os
+import numpy as np
+from granule_reader import read_granule_extract
+from instrumentation import increment, stage
+
+CACHE_DIR = "Logs/granule_cache"
+CACHE_SIZE_MB = 20000.0
+
+
+def cache_key(file_name,bbox,logchl):
+    '''
+
+    Parameters:
+        file_name (str) : path of the Sentinel-3 Polymer netcdf file
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : threshold above which the logchl values are discarded
+
+    Return:
+        key (str) : hash of the identity of the granule and of the filter parameters
+
+    '''
+
+    status = os.stat(file_name)
+    identity = [os.path.realpath(file_name),status.st_size,status.st_mtime_ns,[float(value) for value in bbox],float(logchl)]
+    return hashlib.sha1(json.dumps(identity).encode()).hexdigest()
+
+
+def cache_path(cache_dir,key):
+    '''
+
+    Parameters:
+        cache_dir (str) : directory of the cache
+        key (str) : key of the extract (refer cache_key)
+
+    Return:
+        path (str) : npz file of the extract
+
+    '''
+
+    return "{}/{}/{}.npz".format(cache_dir,key[:2],key)
+
+
+def load_extract(cache_dir,key):
+    '''
+
+    Parameters:
+        cache_dir (str) : directory of the cache
+        key (str) : key of the extract (refer cache_key)
+
+    Return:
+        extract (tuple) : (lat, lon, chl, original_data_size, footprint) as returned by
+                          granule_reader.read_granule_extract, None if the extract is not cached
+
+    '''
+
+    path = cache_path(cache_dir,key)
+    try:
+        with np.load(path) as data:
+            footprint = tuple(None if np.isnan(value) else float(value) for value in data['footprint'])
+            extract = (data['latitude'],data['longitude'],data['logchl'],int(data['original_data_size']),footprint)
+    except (OSError,KeyError,ValueError):
+        ## Missing, evicted meanwhile by another run or unreadable
+        return None
+    ## The modification time marks the last use of the extract for the eviction
+    try:
+        os.utime(path,None)
+    except OSError:
+        pass
+    return extract
+
+
+def save_extract(cache_dir,key,extract):
+    '''
+
+    Parameters:
+        cache_dir (str) : directory of the cache
+        key (str) : key of the extract (refer cache_key)
+        extract (tuple) : (lat, lon, chl, original_data_size, footprint) as returned by
+                          granule_reader.read_granule_extract
+
+    Return:
+        size (int) : size (bytes) of the npz file
+
+    '''
+
+    lat,lon,chl,original_data_size,footprint = extract
+    path = cache_path(cache_dir,key)
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory,exist_ok=True)
+    ## Written under a temporary name and renamed, so that the workers never read a partial file
+    temporary = "{}.{}.tmp".format(path,os.getpid())
+    with open(temporary,'wb') as file:
+        np.savez(file,latitude=lat,longitude=lon,logchl=chl,original_data_size=np.int64(original_data_size),
+                 footprint=np.array([np.nan if value is None else value for value in footprint],dtype=np.float64))
+    os.replace(temporary,path)
+    return os.path.getsize(path)
+
+
+def cached_extract(cache_dir,file_name,bbox,logchl):
+    '''
+
+    Parameters:
+        cache_dir (str) : directory of the cache
+        file_name (str) : path of the Sentinel-3 Polymer netcdf file
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : threshold above which the logchl values are discarded
+
+    Return:
+        extract (tuple) : (lat, lon, chl, original_data_size, footprint) (refer
+                          granule_reader.read_granule_extract)
+        hit (bool) : True if the extract was read from the cache
+
+    '''
+
+    key = cache_key(file_name,bbox,logchl)
+    with stage('granule_cache_load'):
+        extract = load_extract(cache_dir,key)
+    if extract is not None:
+        increment('granule_cache_hits')
+        return extract,True
+    increment('granule_cache_misses')
+    extract = read_granule_extract(file_name,bbox,logchl)
+    with stage('granule_cache_save'):
+        save_extract(cache_dir,key,extract)
+    return extract,False
+
+
+def evict(cache_dir,max_bytes):
+    '''
+
+    Parameters:
+        cache_dir (str) : directory of the cache
+        max_bytes (int) : largest total size (bytes) of the cache
+
+    Return:
+        removed (int) : number of extracts deleted
+        removed_bytes (int) : size (bytes) of the extracts deleted
+        total_bytes (int) : size (bytes) of the cache after the eviction
+
+    '''
+
+    entries = []
+    for directory,_,files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(directory,name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime_ns,status.st_size,path))
+    total_bytes = sum(entry[1] for entry in entries)
+    removed = removed_bytes = 0
+    ## Least recently used first
+    for _,size,path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        removed += 1
+        removed_bytes += size
+    increment('granule_cache_evicted',removed)
+    return removed,removed_bytes,total_bytes
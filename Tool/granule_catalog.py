@@ -0,0 +1,171 @@
+## This python script maintains a catalog (SQLite database) of the Sentinel-3 granules which have
+## already been read by sat_processing.py.
+#
+## For every granule the catalog stores the identity of the file (path, size, modification time),
+## the sensing date and times parsed from the name of the file, the geographical footprint of the
+## swath and the number of pixels which passed the filters for a given bounding box.
+#
+## Later runs consult the catalog before opening a granule. A granule which does not intersect the
+## desired geographical area or time window is skipped without decoding the netcdf file.
+
+
+import os
+import sqlite3
+from granule_reader import parse_granule_name
+
+CATALOG_PATH = "Logs/granule_catalog.sqlite"
+BUSY_TIMEOUT = 60.0 # seconds a write waits for the lock held by another run (for example a concurrent stage of pipeline.py)
+
+
+def open_catalog(path=CATALOG_PATH):
+    '''
+
+    Parameters:
+        path (str) : path of the SQLite database holding the catalog
+
+    Return:
+        conn (sqlite3 connection) : connection to the catalog
+
+    '''
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    ## Several processes can update the catalog at the same time, the write-ahead log lets them read while
+    ## another one writes and the writes wait for the lock instead of failing
+    conn = sqlite3.connect(path,timeout=BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS granules (
+                        path TEXT PRIMARY KEY, size INTEGER, mtime REAL,
+                        date TEXT, starttime TEXT, endtime TEXT, pixels INTEGER,
+                        lat_min REAL, lat_max REAL, lon_min REAL, lon_max REAL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS inbox_counts (
+                        path TEXT, lat_start REAL, lat_end REAL, lon_start REAL, lon_end REAL,
+                        logchl REAL, count INTEGER,
+                        PRIMARY KEY (path, lat_start, lat_end, lon_start, lon_end, logchl))''')
+    return conn
+
+
+def lookup_granule(conn,file_name):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the catalog
+        file_name (str) : path of the Sentinel-3 netcdf file
+
+    Return:
+        row (dict) : catalog entry of the granule, None when the granule is not catalogued or
+                     the file has changed since it was catalogued
+
+    '''
+
+    stat = os.stat(file_name)
+    cursor = conn.execute('''SELECT size, mtime, date, starttime, endtime, pixels,
+                                    lat_min, lat_max, lon_min, lon_max
+                             FROM granules WHERE path = ?''',(file_name,))
+    row = cursor.fetchone()
+    if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime:
+        return None
+    keys = ['size','mtime','date','starttime','endtime','pixels','lat_min','lat_max','lon_min','lon_max']
+    return dict(zip(keys,row))
+
+
+def inbox_count(conn,file_name,bbox,logchl):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the catalog
+        file_name (str) : path of the Sentinel-3 netcdf file
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : logchl threshold used while filtering
+
+    Return:
+        count (int) : number of pixels of the granule which passed the filters, None if unknown
+
+    '''
+
+    cursor = conn.execute('''SELECT count FROM inbox_counts
+                             WHERE path = ? AND lat_start = ? AND lat_end = ? AND lon_start = ?
+                             AND lon_end = ? AND logchl = ?''',(file_name,)+tuple(bbox)+(logchl,))
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def in_time_window(conn,file_name,time_window):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the catalog, None to use the name of the file only
+        file_name (str) : path of the Sentinel-3 netcdf file
+        time_window (tuple of str) : ('YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DD HH:MM:SS') window
+
+    Return:
+        inside (bool) : True if the sensing time of the granule overlaps the time window
+
+    '''
+
+    ## The sensing times of a granule which is not catalogued yet are parsed from the name of the file
+    row = lookup_granule(conn,file_name) if conn is not None else None
+    date,starttime,endtime = parse_granule_name(file_name) if row is None else (row['date'],row['starttime'],row['endtime'])
+    return "{} {}".format(date,endtime) >= time_window[0] and "{} {}".format(date,starttime) <= time_window[1]
+
+
+def granule_can_contribute(conn,file_name,bbox,logchl):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the catalog
+        file_name (str) : path of the Sentinel-3 netcdf file
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : logchl threshold used while filtering
+
+    Return:
+        contributes (bool) : False if the catalog shows that the granule has no pixel in the area,
+                             True if it has, None if the granule has to be opened
+
+    '''
+
+    row = lookup_granule(conn,file_name)
+    if row is None:
+        return None
+    lat_start,lat_end,lon_start,lon_end = bbox
+    if row['lat_min'] is None or row['lat_max'] < lat_start or row['lat_min'] > lat_end \
+            or row['lon_max'] < lon_start or row['lon_min'] > lon_end:
+        return False
+    count = inbox_count(conn,file_name,bbox,logchl)
+    if count is None:
+        return None
+    return count > 0
+
+
+def record_granule(conn,file_name,date,starttime,endtime,pixels,footprint,bbox,logchl,count):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the catalog
+        file_name (str) : path of the Sentinel-3 netcdf file
+        date (str) : date of capture of the granule
+        starttime (str) : sensing start time of the granule
+        endtime (str) : sensing end time of the granule
+        pixels (int) : number of pixels in the granule
+        footprint (tuple) : (lat_min, lat_max, lon_min, lon_max) of the swath
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) used while filtering
+        logchl (float) : logchl threshold used while filtering
+        count (int) : number of pixels which passed the filters
+
+    Return:
+        None
+
+    '''
+
+    stat = os.stat(file_name)
+    previous = conn.execute("SELECT size, mtime FROM granules WHERE path = ?",(file_name,)).fetchone()
+    if previous is not None and (previous[0] != stat.st_size or previous[1] != stat.st_mtime):
+        conn.execute("DELETE FROM inbox_counts WHERE path = ?",(file_name,))
+    conn.execute('''INSERT OR REPLACE INTO granules VALUES (?,?,?,?,?,?,?,?,?,?,?)''',
+                 (file_name,stat.st_size,stat.st_mtime,date,starttime,endtime,int(pixels))+tuple(footprint))
+    conn.execute('''INSERT OR REPLACE INTO inbox_counts VALUES (?,?,?,?,?,?,?)''',
+                 (file_name,)+tuple(bbox)+(logchl,int(count)))
+    ## Committed at once, so the lock is not held while the next granules are decoded
+    conn.commit()
+    return None
@@ -0,0 +1,143 @@
+## This python script maintains the manifest (SQLite database) of the granules which have been
+## processed by sat_processing.py and of the daily outputs which were written from them.
+#
+## A granule is identified by its path, size and modification time together with the filter
+## parameters used while processing it (bounding box, logchl threshold, chl-a cap, output
+## format, output root and time window). A day is marked as completed only after its output has been written, therefore a
+## rerun reprocesses only the new or changed granules and rewrites only the days which are
+## affected by them, while a killed job can be resumed from the first day which was not completed.
+
+
+import datetime
+import json
+import os
+import sqlite3
+
+MANIFEST_PATH = "Logs/granule_manifest.sqlite"
+BUSY_TIMEOUT = 60.0 # seconds a write waits for the lock held by another run (for example a concurrent stage of pipeline.py)
+
+
+def open_manifest(path=MANIFEST_PATH):
+    '''
+
+    Parameters:
+        path (str) : path of the SQLite database holding the manifest
+
+    Return:
+        conn (sqlite3 connection) : connection to the manifest
+
+    '''
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    ## Several processes can update the manifest at the same time, the write-ahead log lets them read while
+    ## another one writes and the writes wait for the lock instead of failing
+    conn = sqlite3.connect(path,timeout=BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS granules (
+                        path TEXT PRIMARY KEY, size INTEGER, mtime REAL, params TEXT, date TEXT,
+                        starttime TEXT, endtime TEXT, pixels INTEGER, count INTEGER)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS days (
+                        date TEXT PRIMARY KEY, params TEXT, completed TEXT)''')
+    return conn
+
+
+def manifest_params(bbox,logchl,chl_cap,output_format,output_root,window=None):
+    '''
+
+    Parameters:
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : logchl threshold used while filtering
+        chl_cap (float) : chl-a values greater than or equal to the cap are discarded
+        output_format (str) : format of the daily outputs
+        output_root (str) : data root under which the daily outputs are written (refer paths.py)
+        window (tuple of str) : sensing time window of the granules processed, None for every granule
+
+    Return:
+        params (str) : canonical representation of the filter parameters
+
+    '''
+
+    return json.dumps({'bbox':list(bbox),'logchl':logchl,'chl_cap':chl_cap,'format':output_format,
+                       'root':os.path.abspath(output_root),'window':None if window is None else list(window)},sort_keys=True)
+
+
+def day_granules(conn,date,params):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the manifest
+        date (str) : date of the day folder ('YYYY-MM-DD')
+        params (str) : filter parameters (refer manifest_params)
+
+    Return:
+        granules (dict) : path -> entry (dict) of the granules recorded for the day with the same
+                          filter parameters
+
+    '''
+
+    keys = ['path','size','mtime','starttime','endtime','pixels','count']
+    cursor = conn.execute('''SELECT path, size, mtime, starttime, endtime, pixels, count
+                             FROM granules WHERE date = ? AND params = ?''',(date,params))
+    return {row[0]:dict(zip(keys,row)) for row in cursor}
+
+
+def granule_unchanged(entry,file_name):
+    '''
+
+    Parameters:
+        entry (dict) : manifest entry of the granule, None if the granule was never processed
+        file_name (str) : path of the Sentinel-3 netcdf file
+
+    Return:
+        unchanged (bool) : True if the file has the same size and modification time as recorded
+
+    '''
+
+    if entry is None:
+        return False
+    stat = os.stat(file_name)
+    return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+
+def day_completed(conn,date,params):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the manifest
+        date (str) : date of the day folder ('YYYY-MM-DD')
+        params (str) : filter parameters (refer manifest_params)
+
+    Return:
+        completed (bool) : True if the output of the day was written with the same parameters
+
+    '''
+
+    row = conn.execute("SELECT params FROM days WHERE date = ?",(date,)).fetchone()
+    return row is not None and row[0] == params
+
+
+def record_day(conn,date,params,granules):
+    '''
+
+    Parameters:
+        conn (sqlite3 connection) : connection to the manifest
+        date (str) : date of the day folder ('YYYY-MM-DD')
+        params (str) : filter parameters (refer manifest_params)
+        granules (list of tuples) : (path, starttime, endtime, pixels, count) of every granule of the day
+
+    Return:
+        None
+
+    '''
+
+    conn.execute("DELETE FROM granules WHERE date = ?",(date,))
+    for file_name,starttime,endtime,pixels,count in granules:
+        stat = os.stat(file_name)
+        conn.execute("INSERT OR REPLACE INTO granules VALUES (?,?,?,?,?,?,?,?,?)",
+                     (file_name,stat.st_size,stat.st_mtime,params,date,starttime,endtime,int(pixels),int(count)))
+    conn.execute("INSERT OR REPLACE INTO days VALUES (?,?,?)",
+                 (date,params,datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
+    return None
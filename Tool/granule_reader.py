@@ -0,0 +1,179 @@
+## This python script reads the chlorophyll-concentration estimates of a single Sentinel-3 Polymer
+## granule (netcdf file) without converting the complete swath into a dataframe.
+#
+## The latitude and longitude arrays of a granule are 2-dimensional (rows x columns of the
+## pushbroom sensor). The rows and columns which contain pixels inside the bounding box of the
+## BC ferry route are located first, and only that window of the 'logchl' variable is read from
+## the file. Therefore, the dataframe built from the granule only contains the pixels which can be
+## used for validation.
+#
+## xarray is only imported when a granule is opened, so the scripts which only use the cached extracts
+## (refer granule_cache.py) or the names of the granules start faster.
+
+
+import datetime
+import numpy as np
+import pandas as pd
+from instrumentation import stage
+from schema import to_epoch, typed
+
+### The values has to be compared/validated with the data collected from BC Ferries which
+### follows a particular path bounded by a particular range of  coordinates.
+### Latitude Range : 48.690000 <-> 49.000000 North
+### Longitude Range : -123.400000 <-> -123.100000 East
+
+LAT_START = 48.690000
+LAT_END = 49.000000
+LON_START = -123.400000
+LON_END = -123.100000
+BBOX = (LAT_START, LAT_END, LON_START, LON_END)
+LOGCHL_THRESHOLD = 100 # setting threshold
+
+
+def parse_granule_name(file_name):
+    '''
+
+    Parameters:
+        file_name (str) : path of the Sentinel-3 netcdf file
+
+    Return:
+        date (str) : date of capture of the granule ('YYYY-MM-DD')
+        start_time (str) : sensing start time of the granule ('HH:MM:SS')
+        end_time (str) : sensing end time of the granule ('HH:MM:SS')
+
+    '''
+
+    ### Fetching date, start_time, end_time from the nomenclature of Sentinel satellite netcdf file
+    ### in order to find the duration of image captured by pushbroom sensors present on satellite
+    ### The sensing stop time is exclusive, hence one second is subtracted from it
+    fn = file_name.split("____")[1].split("_",2)[:2]
+    start = datetime.datetime.strptime(fn[0],"%Y%m%dT%H%M%S")
+    end = datetime.datetime.strptime(fn[1],"%Y%m%dT%H%M%S") - datetime.timedelta(seconds=1)
+    date = start.strftime("%Y-%m-%d")
+    start_time = start.strftime("%H:%M:%S")
+    end_time = end.strftime("%H:%M:%S")
+    return date,start_time,end_time
+
+
+def bbox_mask(latitude,longitude,bbox=BBOX):
+    '''
+
+    Parameters:
+        latitude (numpy array) : latitude values of the pixels
+        longitude (numpy array) : longitude values of the pixels
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+
+    Return:
+        mask (numpy array) : boolean array, True for the pixels lying inside the bounding box
+
+    '''
+
+    lat_start,lat_end,lon_start,lon_end = bbox
+    return (latitude>=lat_start) & (latitude<=lat_end) & (longitude>=lon_start) & (longitude<=lon_end)
+
+
+def bbox_window(latitude,longitude,bbox=BBOX):
+    '''
+
+    Parameters:
+        latitude (2D numpy array) : latitude values of the granule
+        longitude (2D numpy array) : longitude values of the granule
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+
+    Return:
+        rows (slice) : rows of the granule which contain pixels inside the bounding box
+        cols (slice) : columns of the granule which contain pixels inside the bounding box
+        (None, None is returned when no pixel of the granule lies inside the bounding box)
+
+    '''
+
+    mask = bbox_mask(latitude,longitude,bbox)
+    row_idx = np.flatnonzero(mask.any(axis=1))
+    if row_idx.size == 0:
+        return None,None
+    col_idx = np.flatnonzero(mask.any(axis=0))
+    return slice(row_idx[0],row_idx[-1]+1),slice(col_idx[0],col_idx[-1]+1)
+
+
+def granule_footprint(latitude,longitude):
+    '''
+
+    Parameters:
+        latitude (numpy array) : latitude values of the granule
+        longitude (numpy array) : longitude values of the granule
+
+    Return:
+        footprint (tuple) : (lat_min, lat_max, lon_min, lon_max) covered by the swath,
+                            (None, None, None, None) when the granule has no valid coordinate
+
+    '''
+
+    valid = np.isfinite(latitude) & np.isfinite(longitude)
+    if not valid.any():
+        return (None,None,None,None)
+    lat = latitude[valid]
+    lon = longitude[valid]
+    return (float(lat.min()),float(lat.max()),float(lon.min()),float(lon.max()))
+
+
+def read_granule_extract(file_name,bbox=BBOX,logchl=LOGCHL_THRESHOLD):
+    '''
+
+    Parameters:
+        file_name (str) : path of the Sentinel-3 Polymer netcdf file
+        bbox (tuple) : (lat_start, lat_end, lon_start, lon_end) of the desired geographical area
+        logchl (float) : threshold above which the logchl values are discarded (fill values)
+
+    Return:
+        lat (numpy array) : latitudes of the pixels lying inside the bounding box
+        lon (numpy array) : longitudes of these pixels
+        chl (numpy array) : logchl values of these pixels
+        original_data_size (int) : number of pixels in the granule before filtering
+        footprint (tuple) : (lat_min, lat_max, lon_min, lon_max) covered by the swath
+
+    '''
+
+    import xarray as xr
+    with stage('granule_open'):
+        ds = xr.open_dataset(file_name,mask_and_scale=False)
+        latitude = ds['latitude'].values
+        longitude = ds['longitude'].values
+    with ds, stage('subset',rows_in=latitude.size) as counts:
+        original_data_size = latitude.size
+        footprint = granule_footprint(latitude,longitude)
+        rows,cols = bbox_window(latitude,longitude,bbox)
+        if rows is None:
+            lat = lon = chl = np.empty(0)
+        else:
+            ## Only the window of logchl covering the bounding box is read from the file
+            chl = ds['logchl'][rows,cols].values.ravel()
+            lat = latitude[rows,cols].ravel()
+            lon = longitude[rows,cols].ravel()
+            keep = bbox_mask(lat,lon,bbox) & (chl<=logchl)
+            lat,lon,chl = lat[keep],lon[keep],chl[keep]
+        counts['rows_out'] = lat.size
+    return lat,lon,chl,original_data_size,footprint
+
+
+def granule_frame(file_name,lat,lon,chl):
+    '''
+
+    Parameters:
+        file_name (str) : path of the Sentinel-3 Polymer netcdf file
+        lat (numpy array) : latitudes of the pixels of the granule
+        lon (numpy array) : longitudes of the pixels
+        chl (numpy array) : logchl values of the pixels
+
+    Return:
+        df (pandas dataframe) : typed date, starttime, endtime, latitude, longitude and logchl of the pixels (refer schema.py)
+
+    '''
+
+    date,start_time,end_time = parse_granule_name(file_name)
+    ## The date and times are shared by all the pixels, the categorical columns are built from a single value
+    codes = np.zeros(len(lat),dtype=np.int8)
+    df = pd.DataFrame({'date':pd.Categorical.from_codes(codes,[date]),
+                       'starttime':pd.Categorical.from_codes(codes,[to_epoch(date,start_time)]),
+                       'endtime':pd.Categorical.from_codes(codes,[to_epoch(date,end_time)]),
+                       'latitude':lat,'longitude':lon,'logchl':chl})
+    return typed(df)
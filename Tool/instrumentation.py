@@ -0,0 +1,310 @@
+## This python script is the instrumentation shared by the processing, validation and plotting scripts.
+#
+## Every script records structured metrics as JSON lines (one JSON object per line) in a metrics
+## file (Logs/metrics.jsonl by default):
+##  - 'log'     : the messages written to the text logs
+##  - 'stage'   : wall-clock time, CPU time, number of calls and rows in/out of every stage (granule
+##                open, subsetting, csv write, distance, bootstrap, map render, ...), summed over the run
+##  - 'counter' : other counts of the run (granules skipped, days validated, ...)
+##  - 'run'     : duration and peak resident memory (RSS) of the run and of its worker processes
+## The records and the text logs are buffered in memory and written in blocks instead of opening
+## the files on every message. The buffers are flushed at the end of the run (and at exit).
+#
+## Worker processes measure their stages separately (refer measured) and return the totals with
+## their results, so that the parent process records the stages of the whole run.
+#
+## The scripts can also be profiled with cProfile (--profile), the statistics are dumped to a file
+## which can be read with the pstats module or snakeviz.
+
+
+import atexit
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import resource
+import sys
+import time
+
+METRICS_PATH = "Logs/metrics.jsonl"
+BUFFER_LINES = 256 # records (or log messages) kept in memory before they are written
+
+_run = {'script':None,'path':None,'started':None,'wall':None,'cpu':None}
+_records = []
+_logs = {}
+_stages = {}
+_counters = {}
+
+
+def add_arguments(parser):
+    '''
+
+    Parameters:
+        parser (argparse parser) : parser of the command line arguments of a script
+
+    Return:
+        None
+
+    '''
+
+    parser.add_argument("--metrics", type=str, default=METRICS_PATH, help="File (JSON lines) in which the timings, memory usage and row counts of the run are recorded")
+    parser.add_argument("--profile", type=str, default=None, help="File in which the cProfile statistics of the run are dumped (not profiled if omitted)")
+    return None
+
+
+def configure(script,path=METRICS_PATH):
+    '''
+
+    Parameters:
+        script (str) : name of the script being run
+        path (str) : file (JSON lines) in which the metrics are recorded, None to record no metrics
+
+    Return:
+        None
+
+    '''
+
+    if _run['script'] is None:
+        atexit.register(finish)
+    _run.update({'script':script,'path':path,'started':datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 'wall':time.perf_counter(),'cpu':time.process_time()})
+    return None
+
+
+def record(event,**fields):
+    '''
+
+    Parameters:
+        event (str) : type of the record ('log', 'stage', 'counter', 'run', ...)
+        fields : values of the record
+
+    Return:
+        None
+
+    '''
+
+    if _run['path'] is None:
+        return None
+    entry = {'time':datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"),'script':_run['script'],'pid':os.getpid(),'event':event}
+    entry.update(fields)
+    _records.append(json.dumps(entry,default=str))
+    if len(_records) >= BUFFER_LINES:
+        flush()
+    return None
+
+
+def log(path,content):
+    '''
+
+    Parameters:
+        path (str) : text log file to which the message is appended
+        content (str) : message
+
+    Return:
+        None
+
+    '''
+
+    _logs.setdefault(path,[]).append(content)
+    record('log',file=path,message=content)
+    if len(_logs[path]) >= BUFFER_LINES:
+        flush()
+    return None
+
+
+def flush():
+    '''
+
+    Writes the buffered records and log messages to their files.
+
+    Return:
+        None
+
+    '''
+
+    for path in list(_logs):
+        lines = _logs.pop(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        with open(path,'a') as file:
+            file.write("".join(line+"\n" for line in lines))
+    if _records and _run['path'] is not None:
+        directory = os.path.dirname(_run['path'])
+        if directory:
+            os.makedirs(directory,exist_ok=True)
+        with open(_run['path'],'a') as file:
+            file.write("".join(line+"\n" for line in _records))
+    del _records[:]
+    return None
+
+
+## The buffered log messages are written at exit even when the functions of a script are called
+## from another program, without configure (the run is only recorded after configure)
+atexit.register(flush)
+
+
+@contextlib.contextmanager
+def stage(name,rows_in=None):
+    '''
+
+    Parameters:
+        name (str) : name of the stage
+        rows_in (int) : number of rows given to the stage
+
+    Return:
+        rows (dict) : 'rows_in' and 'rows_out' of the stage, which can be set inside the block
+
+    '''
+
+    rows = {'rows_in':rows_in,'rows_out':None}
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield rows
+    finally:
+        totals = _stages.setdefault(name,{'calls':0,'wall_s':0.0,'cpu_s':0.0,'rows_in':0,'rows_out':0})
+        totals['calls'] += 1
+        totals['wall_s'] += time.perf_counter()-wall
+        totals['cpu_s'] += time.process_time()-cpu
+        totals['rows_in'] += int(rows['rows_in'] or 0)
+        totals['rows_out'] += int(rows['rows_out'] or 0)
+
+
+def increment(name,n=1):
+    '''
+
+    Parameters:
+        name (str) : name of the counter
+        n (int) : value added to the counter
+
+    Return:
+        None
+
+    '''
+
+    _counters[name] = _counters.get(name,0) + n
+    return None
+
+
+def take_totals():
+    '''
+
+    Return:
+        totals (dict) : totals of the stages and counters measured so far, which are reset
+
+    '''
+
+    totals = {'stages':dict(_stages),'counters':dict(_counters)}
+    _stages.clear()
+    _counters.clear()
+    return totals
+
+
+def merge_totals(totals):
+    '''
+
+    Parameters:
+        totals (dict) : totals of the stages and counters (refer take_totals), for example measured by a worker process
+
+    Return:
+        None
+
+    '''
+
+    for name,values in totals['stages'].items():
+        target = _stages.setdefault(name,{'calls':0,'wall_s':0.0,'cpu_s':0.0,'rows_in':0,'rows_out':0})
+        for key,value in values.items():
+            target[key] += value
+    for name,value in totals['counters'].items():
+        increment(name,value)
+    return None
+
+
+def measured(function,argument):
+    '''
+
+    Parameters:
+        function (function) : task run by a worker process
+        argument : argument of the task
+
+    Return:
+        result : result of the task
+        totals (dict) : totals of the stages and counters measured during the task (refer merge_totals)
+
+    '''
+
+    ## The totals measured so far (or inherited from the parent process) are put aside, so that
+    ## only the stages of the task are returned
+    saved = take_totals()
+    try:
+        result = function(argument)
+        return result,take_totals()
+    finally:
+        merge_totals(saved)
+
+
+def peak_rss_mb():
+    '''
+
+    Return:
+        rss (float) : peak resident memory (MB) of the process
+        children_rss (float) : largest peak resident memory (MB) of the terminated worker processes
+
+    '''
+
+    ## ru_maxrss is given in kilobytes on Linux and in bytes on macOS
+    scale = 1024.0*1024.0 if sys.platform == 'darwin' else 1024.0
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss/scale)
+
+
+def finish():
+    '''
+
+    Records the totals of the stages and counters and the duration and peak memory of the run, and
+    flushes the buffers.
+
+    Return:
+        None
+
+    '''
+
+    if _run['script'] is not None and _run['wall'] is not None:
+        for name,values in sorted(_stages.items()):
+            record('stage',stage=name,**values)
+        for name,value in sorted(_counters.items()):
+            record('counter',counter=name,value=value)
+        rss,children_rss = peak_rss_mb()
+        record('run',started=_run['started'],wall_s=time.perf_counter()-_run['wall'],cpu_s=time.process_time()-_run['cpu'],
+               peak_rss_mb=rss,children_peak_rss_mb=children_rss,argv=sys.argv[1:])
+        _stages.clear()
+        _counters.clear()
+        _run['wall'] = None
+    flush()
+    return None
+
+
+@contextlib.contextmanager
+def profiled(path):
+    '''
+
+    Parameters:
+        path (str) : file in which the cProfile statistics are dumped, None to run without profiling
+
+    Return:
+        None
+
+    '''
+
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
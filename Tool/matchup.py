@@ -0,0 +1,92 @@
+## This python script pairs the ferry records of a satellite pass with the satellite pixels nearest
+## to them (point-to-pixel matchups), as an alternative to comparing a circle of pixels with all the
+## ferry records of the pass by bootstrapping (refer bootstrap.py).
+#
+## The nearest pixels of all the ferry records are found at once in the spatial index of the day
+## (refer spatial_index.py). A record is matched when its nearest pixel lies within the maximum
+## distance, and its satellite estimate is the mean chl-a of the pixels of its neighbourhood. The
+## pixels are stored as points and not as the rows and columns of the swath, so a box x box
+## neighbourhood is taken as the box*box nearest pixels within the maximum distance.
+#
+## The pairs are compared directly by regression statistics, no resampling is needed.
+
+
+import numpy as np
+from spatial_index import query_nearest
+
+MAX_KM = 0.5 # largest distance (km) between a ferry record and its nearest pixel (OLCI full resolution pixels are 300 m wide)
+STAT_COLUMNS = ['Matchups','Correlation','Slope','Intercept','RMSE','Bias','Mean distance (Kms)','Mean time offset (s)']
+
+
+def match_pixels(index,ferry_lat,ferry_lon,pixel_chl,max_km=MAX_KM,box=1):
+    '''
+
+    Parameters:
+        index (PixelIndex) : spatial index of the satellite pixels of the day
+        ferry_lat (numpy array) : latitudes (degrees) of the ferry records
+        ferry_lon (numpy array) : longitudes (degrees) of the ferry records
+        pixel_chl (numpy array) : chl-a estimates of the satellite pixels, in the order of the index
+        max_km (float) : largest distance (km) between a ferry record and the pixels matched with it
+        box (int) : size of the neighbourhood, the box*box nearest pixels are averaged
+
+    Return:
+        matched (numpy array) : positions of the ferry records having a matchup
+        nearest (numpy array) : position of the nearest pixel of every matched record
+        distance (numpy array) : distance (km) between every matched record and its nearest pixel
+        sat_chl (numpy array) : mean chl-a of the pixels of the neighbourhood of every matched record
+        pixels (numpy array) : number of pixels averaged for every matched record
+
+    '''
+
+    pixel_chl = np.asarray(pixel_chl,dtype=np.float64)
+    if len(ferry_lat) == 0 or len(pixel_chl) == 0:
+        empty = np.empty(0,dtype=np.int64)
+        return empty,empty,np.empty(0),np.empty(0),empty
+    idx,distance = query_nearest(index,ferry_lat,ferry_lon,box*box)
+    within = distance <= max_km
+    matched = np.flatnonzero(within[:,0])
+    idx,distance,within = idx[matched],distance[matched],within[matched]
+    pixels = within.sum(axis=1)
+    sat_chl = np.where(within,pixel_chl[idx],0.0).sum(axis=1)/np.maximum(pixels,1)
+    return matched,idx[:,0],distance[:,0],sat_chl,pixels
+
+
+def regression_stats(ferry_chl,sat_chl,distance=None,time_offset=None):
+    '''
+
+    Parameters:
+        ferry_chl (numpy array) : chl-a of the matched ferry records
+        sat_chl (numpy array) : chl-a of the satellite pixels matched with them
+        distance (numpy array) : distance (km) of every matchup
+        time_offset (numpy array) : time (s) between every ferry record and its satellite pixel
+
+    Return:
+        stats (dict) : number of matchups, Pearson correlation, slope and intercept of the least
+                       squares line of the satellite estimates against the ferry ones, root mean
+                       square difference, mean difference (satellite - ferry), mean distance and
+                       mean absolute time offset
+
+    '''
+
+    ferry_chl = np.asarray(ferry_chl,dtype=np.float64)
+    sat_chl = np.asarray(sat_chl,dtype=np.float64)
+    n = len(ferry_chl)
+    stats = dict((column,np.nan) for column in STAT_COLUMNS)
+    stats['Matchups'] = n
+    if n == 0:
+        return stats
+    difference = sat_chl-ferry_chl
+    stats['RMSE'] = float(np.sqrt(np.mean(difference*difference)))
+    stats['Bias'] = float(np.mean(difference))
+    if distance is not None:
+        stats['Mean distance (Kms)'] = float(np.mean(distance))
+    if time_offset is not None:
+        stats['Mean time offset (s)'] = float(np.mean(np.abs(time_offset)))
+    x = ferry_chl-ferry_chl.mean()
+    y = sat_chl-sat_chl.mean()
+    if n > 2 and (x*x).sum() > 0:
+        stats['Slope'] = float((x*y).sum()/(x*x).sum())
+        stats['Intercept'] = float(sat_chl.mean()-stats['Slope']*ferry_chl.mean())
+        if (y*y).sum() > 0:
+            stats['Correlation'] = float((x*y).sum()/np.sqrt((x*x).sum()*(y*y).sum()))
+    return stats
@@ -0,0 +1,123 @@
+## This python script holds the locations of the input datasets and of the processed data shared by
+## all the scripts.
+#
+## The roots can be changed with environment variables, which is how the pipeline (refer
+## pipeline.py) runs every script on another data root:
+##  - S3VAL_DATA_ROOT : directory holding the processed data (Processed_nc_to_csv, Processed_ferry_to_csv,
+##                      Processed_parquet, Processed_ferry_track and Distribution_Plots), by default the
+##                      parent directory of the working directory (the scripts are run from Tool/)
+##  - S3VAL_OLCI_ROOT : directory of the Sentinel-3 OLCI granules (<year>/<month>/<day>/polymer/*.nc)
+##  - S3VAL_ONC_ROOT : directory of the ferry exports downloaded from ONC (<year>/<month>/*.csv)
+
+
+import os
+
+DATA_ROOT = os.environ.get("S3VAL_DATA_ROOT","..")
+OLCI_ROOT = os.environ.get("S3VAL_OLCI_ROOT","/spectral/OLCI")
+ONC_ROOT = os.environ.get("S3VAL_ONC_ROOT","/spectral/gagan26/Ferry_ONC")
+
+SATELLITE_DIR = "Processed_nc_to_csv"
+FERRY_DIR = "Processed_ferry_to_csv"
+STORE_DIR = "Processed_parquet"
+TRACK_DIR = "Processed_ferry_track"
+PLOTS_DIR = "Distribution_Plots"
+
+
+def data_path(*parts):
+    '''
+
+    Parameters:
+        parts (str) : directories and file name under the data root
+
+    Return:
+        path (str) : path under the data root
+
+    '''
+
+    return "/".join((DATA_ROOT,)+tuple(str(part) for part in parts))
+
+
+def day_dir(directory,date):
+    '''
+
+    Parameters:
+        directory (str) : directory of the processed dataset under the data root (for example SATELLITE_DIR)
+        date (str) : date of the data ('YYYY-MM-DD')
+
+    Return:
+        path (str) : directory of the day
+
+    '''
+
+    year,month,day = date.split("-")
+    return data_path(directory,year,month,day)
+
+
+def day_file(directory,prefix,date):
+    '''
+
+    Parameters:
+        directory (str) : directory of the processed dataset under the data root (for example SATELLITE_DIR)
+        prefix (str) : prefix of the file name (for example 'filtered_nc' or 'clean_ferry_data')
+        date (str) : date of the data ('YYYY-MM-DD')
+
+    Return:
+        path (str) : csv file of the day
+
+    '''
+
+    return "{}/{}_{}.csv".format(day_dir(directory,date),prefix,date)
+
+
+def olci_month(year,month):
+    '''
+
+    Parameters:
+        year (str) : year of the granules
+        month (str) : month of the granules
+
+    Return:
+        path (str) : directory holding the day folders of the granules of the month
+
+    '''
+
+    return "{}/{}/{}".format(OLCI_ROOT,year,month)
+
+
+def onc_month(year,month):
+    '''
+
+    Parameters:
+        year (str) : year of the exports
+        month (str) : month of the exports
+
+    Return:
+        path (str) : directory holding the ferry exports of the month
+
+    '''
+
+    return "{}/{}/{}".format(ONC_ROOT,year,month)
+
+
+def set_roots(data_root=None,olci_root=None,onc_root=None):
+    '''
+
+    Parameters:
+        data_root (str) : directory holding the processed data, unchanged if None
+        olci_root (str) : directory of the Sentinel-3 OLCI granules, unchanged if None
+        onc_root (str) : directory of the ONC ferry exports, unchanged if None
+
+    Return:
+        None
+
+    '''
+
+    ## The environment variables are set as well, so that the scripts run as child processes use the same roots
+    global DATA_ROOT, OLCI_ROOT, ONC_ROOT
+    if data_root is not None:
+        DATA_ROOT = os.environ["S3VAL_DATA_ROOT"] = data_root
+    if olci_root is not None:
+        OLCI_ROOT = os.environ["S3VAL_OLCI_ROOT"] = olci_root
+    if onc_root is not None:
+        ONC_ROOT = os.environ["S3VAL_ONC_ROOT"] = onc_root
+    return None
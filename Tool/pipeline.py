@@ -0,0 +1,305 @@
+## This python script runs the whole pipeline on a range of months, rerunning only the stages whose
+## inputs changed since their last successful run (like make).
+#
+## Every month is processed by four stages, each one running one of the scripts:
+##  - sat        : granules of the month                      -> daily filtered_nc files (sat_processing.py)
+##  - ferry      : ONC exports of the month                   -> daily clean_ferry_data files and track (ferry_processing.py)
+##  - validation : outputs of the sat and ferry stages        -> results table and sat/ferry_filtered files (validation.py)
+##  - plots      : sat/ferry_filtered files of the validation -> comparison plots (distribution_plots.py)
+## The fingerprint of a stage is made of its command and of the path, size and modification time of
+## its input files. It is kept with the fingerprint of the outputs in a state file after every
+## successful run, and the stage is skipped by the next runs as long as both are unchanged. A new or
+## modified granule therefore reruns the sat stage of its month and the stages depending on it, while
+## the ferry stage and the other months are skipped.
+#
+## The stages whose dependencies are done run concurrently (--jobs), for example the sat and ferry
+## stages of a month, or the stages of different months.
+#
+## Run command : python pipeline.py --start 2018-01 --end 2019-12 --data_root /spectral/gagan26 --jobs 4
+
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import paths
+from date_range import month_range
+from instrumentation import add_arguments, configure, finish, increment, record
+
+STATE_PATH = "Logs/pipeline_state.json"
+STAGES = ['sat','ferry','validation','plots']
+DEPENDENCIES = {'sat':[],'ferry':[],'validation':['sat','ferry'],'plots':['validation']}
+SCRIPTS = {'sat':'sat_processing.py','ferry':'ferry_processing.py','validation':'validation.py','plots':'distribution_plots.py'}
+TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the processing, validation and plotting stages of a range of months, only rerunning the stages whose inputs changed",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--start",'-s', type=str, required=True, help="First month of the date range (YYYY-MM)")
+    parser.add_argument("--end",'-e', type=str, required=True, help="Last month of the date range (YYYY-MM)")
+    parser.add_argument("--data_root", type=str, default=None, help="Directory holding the processed data (default {})".format(paths.DATA_ROOT))
+    parser.add_argument("--olci_root", type=str, default=None, help="Directory of the Sentinel-3 OLCI granules (default {})".format(paths.OLCI_ROOT))
+    parser.add_argument("--onc_root", type=str, default=None, help="Directory of the ONC ferry exports (default {})".format(paths.ONC_ROOT))
+    parser.add_argument("--stages", type=str, default=",".join(STAGES), help="Comma separated stages to run ({})".format(", ".join(STAGES)))
+    parser.add_argument("--radius_factor", '-rf',type=int, default=1, choices=[1,2,3,4], help="Radius factor of the validation")
+    parser.add_argument("--n_boot",'-nb',type=int, default=200, help="Number of bootstrap iterations of the validation")
+    parser.add_argument("--seed",type=int, default=0, help="Seed of the random generator of the validation")
+    parser.add_argument("--format",'-f', type=str, default='csv', choices=['csv','parquet'], help="Format of the processed data (parquet requires pyarrow)")
+    parser.add_argument("--jobs",'-j', type=int, default=2, help="Number of stages run at the same time")
+    parser.add_argument("--workers",'-w', type=int, default=1, help="Number of worker processes of every stage")
+    parser.add_argument("--state", type=str, default=STATE_PATH, help="File in which the fingerprints of the completed stages are kept")
+    parser.add_argument("--force", action='store_true', help="Rerun every stage even if its inputs are unchanged")
+    parser.add_argument("--dry_run","--dry-run", action='store_true', help="Only print the stages which would be run")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    args.stages = args.stages.split(",")
+    for name in args.stages:
+        if name not in STAGES:
+            parser.error("unknown stage {}".format(name))
+    if args.jobs < 1 or args.workers < 1:
+        parser.error("--jobs and --workers have to be at least 1")
+    return args
+
+
+def stage_files(name,year,month,data_format='csv'):
+    '''
+
+    Parameters:
+        name (str) : stage of the pipeline ('sat', 'ferry', 'validation' or 'plots')
+        year (str) : year of the month
+        month (str) : month processed by the stage
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+
+    Return:
+        inputs (list of str) : glob patterns of the files read by the stage
+        outputs (list of str) : glob patterns of the files written by the stage
+
+    '''
+
+    def day_files(directory,prefix):
+        if data_format == 'parquet':
+            return paths.data_path(paths.STORE_DIR,prefix,"year="+year,"month="+month,"day=*","*.parquet")
+        return paths.data_path(directory,year,month,"*","{}_*.csv".format(prefix))
+
+    ## The datasets of the columnar store are named as the prefixes of the csv files
+    sat_output = day_files(paths.SATELLITE_DIR,'filtered_nc')
+    ferry_outputs = [day_files(paths.FERRY_DIR,'clean_ferry' if data_format == 'parquet' else 'clean_ferry_data'),
+                     paths.data_path(paths.TRACK_DIR,year,month,"*.npy")]
+    filtered = [day_files(paths.SATELLITE_DIR,'sat_filtered'),day_files(paths.FERRY_DIR,'ferry_filtered')]
+    if name == 'sat':
+        return [paths.olci_month(year,month)+"/*/polymer/S3[AB]*"],[sat_output]
+    if name == 'ferry':
+        return [paths.onc_month(year,month)+"/*.csv"],ferry_outputs
+    if name == 'validation':
+        return [sat_output]+ferry_outputs,filtered+["Results_exp_{}/{}_*.csv".format(month,year)]
+    return filtered,[paths.data_path(paths.PLOTS_DIR,"Comparison",year,month,"*.png")]
+
+
+def stage_command(name,year,month,args):
+    '''
+
+    Parameters:
+        name (str) : stage of the pipeline
+        year (str) : year of the month
+        month (str) : month processed by the stage
+        args (argparse namespace) : arguments of the pipeline
+
+    Return:
+        command (list of str) : command line of the script run by the stage, without the options
+                                which do not change its outputs (number of workers, metrics file)
+
+    '''
+
+    command = [SCRIPTS[name],"--month",month,"--year",year,"--format",args.format]
+    if name == 'validation':
+        command += ["--radius_factor",str(args.radius_factor),"--n_boot",str(args.n_boot),"--seed",str(args.seed),"--no_map"]
+    if name == 'plots':
+        command += ["--dataset","Comparison"]
+    return command
+
+
+def fingerprint(patterns,extra=None):
+    '''
+
+    Parameters:
+        patterns (list of str) : glob patterns of the files
+        extra (list) : other values included in the fingerprint (for example the command of the stage)
+
+    Return:
+        digest (str) : hash of the path, size and modification time of every file matching the patterns
+        count (int) : number of files matching the patterns
+
+    '''
+
+    entries = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            status = os.stat(path)
+            entries.append([path,status.st_size,status.st_mtime_ns])
+    digest = hashlib.sha1(json.dumps([extra,entries]).encode()).hexdigest()
+    return digest,len(entries)
+
+
+def load_state(path):
+    '''
+
+    Parameters:
+        path (str) : state file of the pipeline
+
+    Return:
+        state (dict) : stage id -> fingerprints of the inputs and outputs of its last successful run
+
+    '''
+
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_state(state,path):
+    '''
+
+    Parameters:
+        state (dict) : stage id -> fingerprints of the inputs and outputs of its last successful run
+        path (str) : state file of the pipeline
+
+    Return:
+        None
+
+    '''
+
+    ## The state is replaced at once, so that a killed run never leaves a truncated file
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path+".tmp",'w') as file:
+        json.dump(state,file,indent=1,sort_keys=True)
+    os.replace(path+".tmp",path)
+    return None
+
+
+def run_stage(command,workers=1,metrics=None):
+    '''
+
+    Parameters:
+        command (list of str) : command line of the script (refer stage_command)
+        workers (int) : number of worker processes of the script
+        metrics (str) : metrics file of the script, None to record no metrics
+
+    Return:
+        returncode (int) : exit status of the script
+        wall (float) : duration (s) of the stage
+
+    '''
+
+    full_command = [sys.executable,os.path.join(TOOL_DIR,command[0])]+command[1:]
+    if command[0] != 'ferry_processing.py':
+        full_command += ["--workers",str(workers)]
+    if metrics is not None:
+        full_command += ["--metrics",metrics]
+    start = time.perf_counter()
+    with open(os.devnull,'w') as devnull:
+        returncode = subprocess.call(full_command,stdout=devnull)
+    return returncode,time.perf_counter()-start
+
+
+def run_pipeline(months,args):
+    '''
+
+    Parameters:
+        months (list of tuples) : (year, month) of every month to process
+        args (argparse namespace) : arguments of the pipeline
+
+    Return:
+        status (dict) : stage id ('<stage>:<year>-<month>') -> 'run', 'skipped', 'failed', 'blocked' or 'no input'
+
+    '''
+
+    state = load_state(args.state)
+    pending = ["{}:{}-{}".format(name,year,month) for year,month in months for name in STAGES if name in args.stages]
+    status = {}
+    running = {}
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs)
+    try:
+        while pending or running:
+            for stage_id in list(pending):
+                name,period = stage_id.split(":")
+                year,month = period.split("-")
+                dependencies = ["{}:{}".format(dependency,period) for dependency in DEPENDENCIES[name] if dependency in args.stages]
+                if any(status.get(dependency) is None for dependency in dependencies):
+                    continue
+                pending.remove(stage_id)
+                if any(status[dependency] in ('failed','blocked') for dependency in dependencies):
+                    status[stage_id] = 'blocked'
+                    print("{:<22} blocked (a dependency failed)".format(stage_id))
+                    continue
+                ## The fingerprints are taken once the dependencies are done, as their outputs are the inputs of the stage
+                inputs,outputs = stage_files(name,year,month,args.format)
+                command = stage_command(name,year,month,args)
+                input_digest,input_count = fingerprint(inputs,command)
+                if input_count == 0:
+                    status[stage_id] = 'no input'
+                    print("{:<22} no input".format(stage_id))
+                    continue
+                previous = state.get(stage_id,{})
+                if not args.force and previous.get('inputs') == input_digest and previous.get('outputs') == fingerprint(outputs)[0]:
+                    status[stage_id] = 'skipped'
+                    increment('stages_skipped')
+                    print("{:<22} up to date".format(stage_id))
+                    continue
+                print("{:<22} {}".format(stage_id,"would run" if args.dry_run else "running : "+" ".join(command)))
+                if args.dry_run:
+                    status[stage_id] = 'run'
+                    continue
+                running[executor.submit(run_stage,command,args.workers,args.metrics)] = (stage_id,input_digest,outputs)
+            if not running:
+                continue
+            done,_ = concurrent.futures.wait(running,return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage_id,input_digest,outputs = running.pop(future)
+                returncode,wall = future.result()
+                record('pipeline_stage',stage=stage_id,returncode=returncode,wall_s=wall)
+                if returncode != 0:
+                    status[stage_id] = 'failed'
+                    increment('stages_failed')
+                    state.pop(stage_id,None)
+                    print("{:<22} failed (exit status {}) after {:.1f} s".format(stage_id,returncode,wall))
+                else:
+                    status[stage_id] = 'run'
+                    increment('stages_run')
+                    state[stage_id] = {'inputs':input_digest,'outputs':fingerprint(outputs)[0],
+                                       'finished':time.strftime("%Y-%m-%d %H:%M:%S")}
+                    print("{:<22} done in {:.1f} s".format(stage_id,wall))
+                save_state(state,args.state)
+    finally:
+        executor.shutdown(wait=True)
+    return status
+
+
+def main(argv=None):
+    '''
+
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        status (int) : exit status, 1 if a stage failed or was blocked
+
+    '''
+
+    args = get_args(argv)
+    paths.set_roots(args.data_root,args.olci_root,args.onc_root)
+    configure('pipeline',args.metrics)
+    status = run_pipeline(month_range(args.start,args.end),args)
+    finish()
+    return 1 if any(value in ('failed','blocked') for value in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
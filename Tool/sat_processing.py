@@ -9,126 +9,476 @@
 ## The code logic is designed in such a way that the satellite data points which are in close 
 ## proximity to the specific BC ferry route, are only chosen while the rest are not taken into 
 ## consideration
+#
+## The granules of both Sentinel-3A and Sentinel-3B are processed. The pixels of all the passes of a
+## day are written to the same daily file, grouped by satellite pass (starttime, endtime), so that
+## every pass can be validated with the ferry records of its own time-window (refer validation.py)
 
 
 import numpy as np
 import glob
 import pandas as pd
-import xarray as xr
 import os 
 import time
 import argparse
+import functools
+import multiprocessing
+from granule_cache import CACHE_DIR, CACHE_SIZE_MB, cached_extract, evict
+from granule_catalog import CATALOG_PATH, granule_can_contribute, in_time_window, lookup_granule, open_catalog, record_granule
+from columnar_store import partition_exists, read_partition, remove_partition, store_root, write_partition
+from granule_manifest import MANIFEST_PATH, day_completed, day_granules, granule_unchanged, manifest_params, open_manifest, record_day
+from date_range import month_range
+from instrumentation import add_arguments, configure, finish, flush, increment, measured, merge_totals, profiled, record, stage
+from granule_reader import BBOX, LOGCHL_THRESHOLD, granule_frame, parse_granule_name, read_granule_extract
+from paths import SATELLITE_DIR, data_path, day_dir, day_file, olci_month
+from schema import SATELLITE_COLUMNS, read_frame, to_epoch, typed, write_frame
+
+MAX_TASKS_PER_CHILD = 20 # granules read by a worker process before it is replaced
+CHL_CAP = 50 # chl-a values greater than or equal to the cap are discarded
 
 ### To pass the run time variables of start and end months and year
 
 
-def get_args():
+def get_args(argv=None):
     parser = argparse.ArgumentParser(description="This script takes the arguments from user",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("--month",'-m', type=str,required=True,choices=['01','02','03','04','05','06','07','08','09','10','11','12'], help="Months (type a desired month number in the range [01,12]")
-    parser.add_argument("--year",'-y', type=int, required=True, help="Type the desired year")
-    return parser.parse_args()
+    parser.add_argument("--month",'-m', type=str,choices=['01','02','03','04','05','06','07','08','09','10','11','12'], help="Months (type a desired month number in the range [01,12]")
+    parser.add_argument("--year",'-y', type=int, help="Type the desired year")
+    parser.add_argument("--start",'-s', type=str, help="First month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--end",'-e', type=str, help="Last month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--workers",'-w', type=int, default=1, help="Number of worker processes reading the granules")
+    parser.add_argument("--catalog", type=str, default=CATALOG_PATH, help="Granule catalog used to skip granules which do not cross the ferry route")
+    parser.add_argument("--format",'-f', type=str, default='csv', choices=['csv','parquet'], help="Output format of the daily filtered data (parquet requires pyarrow)")
+    parser.add_argument("--no_catalog", action='store_true', help="Open every granule without consulting or updating the granule catalog")
+    parser.add_argument("--manifest", type=str, default=MANIFEST_PATH, help="Granule manifest used to reprocess only the new or changed granules")
+    parser.add_argument("--cache", type=str, default=CACHE_DIR, help="Local directory caching the pixels extracted from the granules (preferably on a local disk)")
+    parser.add_argument("--cache_size", type=float, default=CACHE_SIZE_MB, help="Largest size (MB) of the granule cache, the least recently used extracts are evicted")
+    parser.add_argument("--no_cache", action='store_true', help="Read every granule from its netcdf file without using the granule cache")
+    parser.add_argument("--window", type=str, nargs=2, metavar=('START','END'), default=None, help="Sensing time window ('YYYY-MM-DD HH:MM:SS') of the granules to process, the days are written from the granules of the window only")
+    add_arguments(parser)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action='store_true', help="Continue a killed job, the days completed by an earlier run are not checked again")
+    mode.add_argument("--force", action='store_true', help="Reprocess every granule even if it is unchanged since the last run")
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end have to be given together")
+    if args.start is None and (args.month is None or args.year is None):
+        parser.error("either --month and --year or --start and --end are required")
+    if args.workers < 1:
+        parser.error("--workers has to be at least 1")
+    if args.cache_size <= 0:
+        parser.error("--cache_size has to be positive")
+    if args.window is not None:
+        for value in args.window:
+            try:
+                time.strptime(value,"%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                parser.error("--window has to be given as 'YYYY-MM-DD HH:MM:SS' 'YYYY-MM-DD HH:MM:SS'")
+        if args.window[0] > args.window[1]:
+            parser.error("the start of --window has to precede its end")
+        args.window = tuple(args.window)
+    return args
+
+
+def process_granule(file_name,cache=None):
+    '''
+
+    Parameters:
+        file_name (str) : path of the Sentinel-3 Polymer netcdf file
+        cache (str) : directory of the granule cache, None to always read the netcdf file
 
-def satellite_data_cleaning(startyear,startmonth):
+    Return:
+        day0_df (pandas dataframe) : pixels of the granule lying in the desired geographical area
+        file_size (int) : number of pixels in the granule before filtering
+        footprint (tuple) : (lat_min, lat_max, lon_min, lon_max) covered by the swath
+        cached (bool) : True if the pixels were read from the granule cache
+
+    '''
+
+    ### Only the rows and columns of the granule lying in the bounding box of the ferry route
+    ### are read from the netcdf file (refer granule_reader.py), or from the local copy of an
+    ### earlier read (refer granule_cache.py)
+    if cache is None:
+        extract,cached = read_granule_extract(file_name,BBOX,LOGCHL_THRESHOLD),False
+    else:
+        extract,cached = cached_extract(cache,file_name,BBOX,LOGCHL_THRESHOLD)
+    lat,lon,chl,file_size,footprint = extract
+    return granule_frame(file_name,lat,lon,chl),file_size,footprint,cached
+
+
+def granule_folders(months):
+    '''
+
+    Parameters:
+        months (list of tuples) : (year, month) strings to be processed
+
+    Return:
+        folders (list of tuples) : (year, month, day folder, granule files of the day) in the order of processing
+
+    '''
+
+    folders = []
+    for startyear,startmonth in months:
+        for folder in sorted(glob.glob(olci_month(startyear,startmonth)+"/*")):
+            ## Granules of Sentinel-3A and Sentinel-3B
+            folders.append((startyear,startmonth,folder,sorted(glob.glob("{}/polymer/S3[AB]*".format(folder)))))
+    return folders
+
+
+def satellite_data_cleaning(startyear,startmonth,workers=1,catalog=CATALOG_PATH,output_format='csv',manifest=MANIFEST_PATH,mode='incremental',cache=CACHE_DIR,cache_size=CACHE_SIZE_MB,window=None):
     
     '''
 
     Parameters:
         startyear (str) : year for which satellite-dataset cleaning is required
         startmonth (str) : month for which satellite-dataset cleaning is required
+        workers (int) : number of worker processes reading the granules
+        catalog (str) : path of the granule catalog, None to open every granule
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
+        manifest (str) : path of the granule manifest, None to process every granule
+        mode (str) : 'incremental', 'resume' or 'force' (refer satellite_range_cleaning)
+        cache (str) : directory of the granule cache, None to read every granule from its netcdf file
+        cache_size (float) : largest size (MB) of the granule cache
+        window (tuple of str) : sensing time window of the granules to process (refer satellite_range_cleaning)
 
     Return:
         None
 
     '''
 
-    count = 0
-    log_file = open("Logs/logs_nc_{}/{}.txt".format(startmonth,startyear),'a')
-
-    for folder in sorted(glob.glob("/spectral/OLCI/{}/{}/*".format(startyear,startmonth))):
-        day_df = pd.DataFrame(columns = ['date','starttime','endtime','latitude','longitude','logchl'])
-        count = 0
-        original_data_size = 0
-        log_file.write("\n")
-        for file_name in sorted(glob.glob("{}/polymer/S3A*".format(folder))):
-            count = count +1 
-            
-            ds=xr.open_dataset(file_name,mask_and_scale=False)
-            dataframe = ds.to_dataframe()
-            dataframe.reset_index(inplace=True) ## resets the index from matrix format to continuous values
-            df = dataframe[["latitude","longitude","logchl"]]
-            original_data_size = original_data_size + df.shape[0]
-            fn = file_name.split("____")[1].split("_",2)[:2]
-            
-            ### Fetching date, start_time, end_time from the nomenclature of Sentinel satellite netcdf file  
-            ### in order to find the duration of image captured by pushbroom sensors present on satellite    
-            date = fn[0].split("T")[0]    
-            start_time = fn[0].split("T")[1]
-            end_time = str(int(fn[1].split("T")[1])-1)
-            date = '{}-{}-{}'.format(date[:4],date[4:6],date[6:])
-            start_time = '{}:{}:{}'.format(start_time[:2],start_time[2:4],start_time[4:])
-            end_time = '{}:{}:{}'.format(end_time[:2],end_time[2:4],end_time[4:])
-
-            
-            
-            log_file.write(("Processing files from {}\n".format(date)))
-            log_file.write("\tReading file number {} from {}\n".format(count,date))
-            log_file.write("\tNumber of data points in file {} before filtering: {}\n".format(count,df.shape[0]))
-            
-
-            df.insert(0,'date',date)
-            df.insert(1,'starttime',start_time)
-            df.insert(2, 'endtime',end_time)
-            
-
-            ### The values has to be compared/validated with the data collected from BC Ferries which 
-            ### follows a particular path bounded by a particular range of  coordinates.
-            ### Therefore, its mandatory to filter out the unnecessary coordinates present in Netcdf file 
-            ### Latitude Range : 48.690000 <-> 49.000000 North 
-            ### Longitude Range : -123.400000 <-> -123.100000 East
-
-            lat_start = 48.690000
-            lat_end = 49.000000
-            lon_start = -123.400000
-            lon_end = -123.100000
-            logchl = 100 # setting threshold
-            
-            day0_df = df[(((df["latitude"]>=lat_start) & (df["latitude"]<=lat_end)) & ((df["longitude"]>=lon_start) & (df["longitude"]<=lon_end)) & (df["logchl"]<=logchl))]
-            if day0_df.shape[0]!=0:
-                log_file.write("\tNumber of data points in file {} after filtering : {}\n".format(count,day0_df.shape[0]))
-                day_df = day_df.append(day0_df,ignore_index=True)
-            else:
-                log_file.write("\tNumber of data points in file {} after filtering : '0' as the pushbroom sensor doesnot traverses the desired geographical area\n".format(count))
-            
-            
-            
-        final_data_size = day_df.shape[0]
-        log_file.write("Total data points from {} before filtering : {}\n".format(date,original_data_size))
-        log_file.write("Total data points from {} after filtering : {}\n".format(date,final_data_size))
-        if day_df.shape[0]!=0:
-
-            day_df['logchl'] = np.power(10,day_df.logchl)
-            day_df.columns = ['date','starttime','endtime','latitude','longitude','chl']
-            day_df = day_df[(day_df['chl']<50)]
-            day = str(date[8:])
-            if not os.path.isdir("../Processed_nc_to_csv/{}/{}/{}".format(startyear,startmonth,day)):
-                os.mkdir("../Processed_nc_to_csv/{}/{}/{}".format(startyear,startmonth,day))
-            day_df.to_csv("/spectral/gagan26/Processed_nc_to_csv/{}/{}/{}/filtered_nc_{}-{}-{}.csv".format(startyear,startmonth,day,startyear,startmonth,day))
-            log_file.write("Processing completed for {}-{}-{}\n".format(startyear,startmonth,day))
-    log_file.close()
+    satellite_range_cleaning([(startyear,startmonth)],workers,catalog,output_format,manifest,mode,cache,cache_size,window)
     return None
 
-args = get_args()
-month = args.month
-year = str(args.year)
 
-satellite_data_cleaning(year, month)
+def plan_days(folders,manifest_conn,params,mode,output_format='csv'):
 
+    '''
 
+    Parameters:
+        folders (list of tuples) : (year, month, day folder, granule files of the day)
+        manifest_conn (sqlite3 connection) : connection to the granule manifest, None to process every day
+        params (str) : filter parameters recorded in the manifest
+        mode (str) : 'incremental' to process the days with new, changed or removed granules,
+                     'resume' to also trust the days completed by an earlier run without checking
+                     their granules, 'force' to process every day
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
 
+    Return:
+        days (list of tuples) : (year, month, date, granule files, manifest entries of the unchanged
+                                granules) of the days which have to be processed
 
+    '''
 
-    
+    days = []
+    for startyear,startmonth,folder,files in folders:
+        date = "{}-{}-{}".format(startyear,startmonth,os.path.basename(folder))
+        if manifest_conn is None or mode == 'force':
+            days.append((startyear,startmonth,date,files,{}))
+            continue
+        recorded = day_granules(manifest_conn,date,params)
+        ## A day whose output was deleted since it was written is processed again from all its granules
+        ## (the days without any filtered pixel have no output)
+        output_lost = any(entry['count'] for entry in recorded.values()) and not day_output_exists(date,output_format)
+        completed = day_completed(manifest_conn,date,params) and not output_lost
+        if mode == 'resume' and completed:
+            continue
+        unchanged = {} if output_lost else {file_name:recorded[file_name] for file_name in files if granule_unchanged(recorded.get(file_name),file_name)}
+        if completed and len(unchanged) == len(files) == len(recorded):
+            continue
+        days.append((startyear,startmonth,date,files,unchanged))
+    return days
+
+
+def satellite_range_cleaning(months,workers=1,catalog=CATALOG_PATH,output_format='csv',manifest=MANIFEST_PATH,mode='incremental',cache=CACHE_DIR,cache_size=CACHE_SIZE_MB,window=None):
+
+    '''
+
+    Parameters:
+        months (list of tuples) : (year, month) strings for which satellite-dataset cleaning is required
+        workers (int) : number of worker processes reading the granules
+        catalog (str) : path of the granule catalog, None to open every granule
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
+        manifest (str) : path of the granule manifest, None to process every granule
+        mode (str) : 'incremental', 'resume' or 'force' (refer plan_days)
+        cache (str) : directory of the granule cache, None to read every granule from its netcdf file
+        cache_size (float) : largest size (MB) of the granule cache, the least recently used
+                             extracts are evicted after every day
+        window (tuple of str) : ('YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DD HH:MM:SS') sensing time window of the
+                                granules to process, None for every granule
+
+    Return:
+        None
+
+    '''
+
+    folders = granule_folders(months)
+    conn = open_catalog(catalog) if catalog is not None else None
 
+    ### Granules sensed outside the time window are left out of their days, and the days without
+    ### any granule in the window are not processed (refer granule_catalog.py)
+    if window is not None:
+        folders = [(startyear,startmonth,folder,[file_name for file_name in files if in_time_window(conn,file_name,window)])
+                   for startyear,startmonth,folder,files in folders]
+        folders = [folder for folder in folders if folder[3]]
+
+    ### Only the days with new, changed or removed granules are processed again and only their
+    ### new or changed granules are read (refer granule_manifest.py)
+    params = manifest_params(BBOX,LOGCHL_THRESHOLD,CHL_CAP,output_format,data_path(),window)
+    manifest_conn = open_manifest(manifest) if manifest is not None else None
+    days = plan_days(folders,manifest_conn,params,mode,output_format)
+
+    ### Granules which are known from the catalog not to cross the desired geographical area are
+    ### never opened (refer granule_catalog.py)
+    skipped = {}
+    if conn is not None:
+        for _,_,_,files,unchanged in days:
+            for file_name in files:
+                if file_name not in unchanged and granule_can_contribute(conn,file_name,BBOX,LOGCHL_THRESHOLD) is False:
+                    skipped[file_name] = lookup_granule(conn,file_name)
+    file_names = [file_name for _,_,_,files,unchanged in days for file_name in files
+                  if file_name not in skipped and file_name not in unchanged]
+
+    ### The granules of the whole date range are spread over the worker processes. Results are
+    ### returned in the order of submission, so that the days can be merged and logged one after
+    ### the other as the granules complete. Workers are restarted after a few granules to keep
+    ### their memory bounded.
+    ### The stages measured while reading a granule are returned with its pixels (refer instrumentation.py)
+    pool = None
+    task = functools.partial(measured,functools.partial(process_granule,cache=cache))
+    if workers > 1:
+        flush()
+        pool = multiprocessing.Pool(processes=workers,maxtasksperchild=MAX_TASKS_PER_CHILD)
+        results = pool.imap(task,file_names,chunksize=1)
+    else:
+        results = map(task,file_names)
+    increment('granules_skipped_catalog',len(skipped))
+
+    log_file = None
+    log_month = None
+    try:
+        for startyear,startmonth,date,files,unchanged in days:
+            if log_month != (startyear,startmonth):
+                if log_file is not None:
+                    log_file.close()
+                log_path = "Logs/logs_nc_{}/{}.txt".format(startmonth,startyear)
+                os.makedirs(os.path.dirname(log_path),exist_ok=True)
+                log_file = open(log_path,'a')
+                log_file.write("\nRun started at {} ({} mode)\n".format(time.strftime("%Y-%m-%d %H:%M:%S"),mode))
+                log_month = (startyear,startmonth)
+
+            day_frames = []
+            granules = []
+            count = 0
+            original_data_size = 0
+            final_data_size = 0
+            cache_hits = 0
+            cache_misses = 0
+            log_file.write("\n")
+            for file_name in files:
+                count = count +1 
+                
+                granule_date,start_time,end_time = parse_granule_name(file_name)
+                if file_name in unchanged:
+                    entry = unchanged[file_name]
+                    original_data_size = original_data_size + entry['pixels']
+                    final_data_size = final_data_size + entry['count']
+                    granules.append((file_name,start_time,end_time,entry['pixels'],entry['count']))
+                    increment('granules_unchanged')
+                    continue
+                if file_name in skipped:
+                    file_size = skipped[file_name]['pixels']
+                    day0_df = None
+                    cached = False
+                else:
+                    (day0_df,file_size,footprint,cached),totals = next(results)
+                    merge_totals(totals)
+                    increment('granules_read')
+                    cache_hits = cache_hits + cached
+                    cache_misses = cache_misses + (cache is not None and not cached)
+                    if conn is not None:
+                        record_granule(conn,file_name,granule_date,start_time,end_time,file_size,footprint,
+                                       BBOX,LOGCHL_THRESHOLD,day0_df.shape[0])
+                filtered_size = 0 if day0_df is None else day0_df.shape[0]
+                original_data_size = original_data_size + file_size
+                final_data_size = final_data_size + filtered_size
+                granules.append((file_name,start_time,end_time,file_size,filtered_size))
+                record('granule',file=file_name,date=granule_date,rows_in=int(file_size),rows_out=int(filtered_size),skipped=day0_df is None,cached=cached)
+                
+                log_file.write(("Processing files from {}\n".format(granule_date)))
+                log_file.write("\tReading file number {} from {}\n".format(count,granule_date))
+                log_file.write("\tNumber of data points in file {} before filtering: {}\n".format(count,file_size))
+                
+                if day0_df is None:
+                    log_file.write("\tNumber of data points in file {} after filtering : '0' as the pushbroom sensor doesnot traverses the desired geographical area (skipped using the granule catalog)\n".format(count))
+                elif day0_df.shape[0]!=0:
+                    log_file.write("\tNumber of data points in file {} after filtering : {}\n".format(count,day0_df.shape[0]))
+                    day_frames.append(day0_df)
+                else:
+                    log_file.write("\tNumber of data points in file {} after filtering : '0' as the pushbroom sensor doesnot traverses the desired geographical area\n".format(count))
+
+            ### The filtered data points of the unchanged granules are taken from the existing output of the day
+            kept_df = None
+            if unchanged:
+                log_file.write("\tReusing the filtered data points of {} unchanged files from {}\n".format(len(unchanged),date))
+                with stage('day_output_read') as counts:
+                    kept_df = read_day_output(date,output_format)
+                    counts['rows_out'] = 0 if kept_df is None else len(kept_df)
+                if kept_df is not None:
+                    passes = set((to_epoch(date,entry['starttime']),to_epoch(date,entry['endtime'])) for entry in unchanged.values())
+                    kept_df = kept_df[[key in passes for key in zip(kept_df['starttime'],kept_df['endtime'])]]
+                
+            ### The least recently used extracts are evicted once the day is written, so that the
+            ### cache stays below its size
+            if cache is not None:
+                log_file.write("\tGranule cache : {} files read from the cache, {} files read from the netcdf granules\n".format(cache_hits,cache_misses))
+                with stage('granule_cache_evict'):
+                    removed,removed_bytes,total_bytes = evict(cache,cache_size*1024*1024)
+                if removed:
+                    log_file.write("\tGranule cache : {} least recently used files evicted ({:.1f} MB), {:.1f} MB kept\n".format(removed,removed_bytes/1024.0/1024.0,total_bytes/1024.0/1024.0))
+            write_day(day_frames,kept_df,date,original_data_size,final_data_size,log_file,output_format)
+            increment('days_written')
+            if manifest_conn is not None:
+                record_day(manifest_conn,date,params,granules)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if log_file is not None:
+            log_file.close()
+        if conn is not None:
+            conn.close()
+        if manifest_conn is not None:
+            manifest_conn.close()
+    return None
+
+
+def day_output_path(date):
+
+    '''
+
+    Parameters:
+        date (str) : date of the granules ('YYYY-MM-DD')
 
+    Return:
+        path (str) : path of the daily csv file
+
+    '''
+
+    return day_file(SATELLITE_DIR,'filtered_nc',date)
+
+
+def day_output_exists(date,output_format='csv'):
+
+    '''
+
+    Parameters:
+        date (str) : date of the granules ('YYYY-MM-DD')
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
+
+    Return:
+        exists (bool) : True if the output of the day is found under the current data root
+
+    '''
+
+    if output_format == 'parquet':
+        return partition_exists(store_root(),'filtered_nc',date)
+    return os.path.isfile(day_output_path(date))
+
+
+def read_day_output(date,output_format='csv'):
+
+    '''
+
+    Parameters:
+        date (str) : date of the granules ('YYYY-MM-DD')
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
+
+    Return:
+        day_df (pandas dataframe) : typed existing output of the day (refer schema.py), None if there is none
+
+    '''
+
+    if not day_output_exists(date,output_format):
+        return None
+    if output_format == 'parquet':
+        return read_partition(store_root(),'filtered_nc',date)
+    return read_frame(day_output_path(date))
+
+
+def write_day(day_frames,kept_df,date,original_data_size,final_data_size,log_file,output_format='csv'):
+
+    '''
+
+    Parameters:
+        day_frames (list of dataframes) : filtered pixels (logchl) of the granules read for the day
+        kept_df (pandas dataframe) : rows (chl) of the existing output kept for unchanged granules, or None
+        date (str) : date of the granules ('YYYY-MM-DD')
+        original_data_size (int) : number of pixels of the day before filtering
+        final_data_size (int) : number of pixels of the day after filtering
+        log_file (file) : log file of the month
+        output_format (str) : 'csv' for daily csv files or 'parquet' for the columnar store
+
+    Return:
+        None
+
+    '''
+
+    day_df = pd.concat(day_frames,ignore_index=True) if day_frames else pd.DataFrame(columns = ['date','starttime','endtime','latitude','longitude','logchl'])
+    log_file.write("Total data points from {} before filtering : {}\n".format(date,original_data_size))
+    log_file.write("Total data points from {} after filtering : {}\n".format(date,final_data_size))
+    day_df['logchl'] = np.power(10,day_df.logchl.astype('float64'))
+    day_df.columns = SATELLITE_COLUMNS
+    day_df = day_df[(day_df['chl']<CHL_CAP)]
+    if kept_df is not None:
+        day_df = pd.concat([kept_df[SATELLITE_COLUMNS],day_df],ignore_index=True)
+    ## The pixels of every satellite pass are kept together, in the order of the passes
+    day_df = typed(day_df)
+    day_df = day_df.sort_values(by=['starttime','endtime'],kind='stable').reset_index(drop=True)
+    if final_data_size!=0:
+        year,month,day = date.split("-")
+        if output_format == 'parquet':
+            with stage('parquet_write',rows_in=len(day_df)) as counts:
+                write_partition(day_df,store_root(),'filtered_nc',date)
+                counts['rows_out'] = len(day_df)
+            log_file.write("Processing completed for {}-{}-{}\n".format(year,month,day))
+            return None
+        if not os.path.isdir(day_dir(SATELLITE_DIR,date)):
+            os.makedirs(day_dir(SATELLITE_DIR,date))
+        with stage('csv_write',rows_in=len(day_df)) as counts:
+            write_frame(day_df,day_output_path(date))
+            counts['rows_out'] = len(day_df)
+        log_file.write("Processing completed for {}-{}-{}\n".format(year,month,day))
+    elif output_format == 'csv' and os.path.isfile(day_output_path(date)):
+        ## The granules of an earlier output of the day no longer contribute any pixel
+        os.remove(day_output_path(date))
+    elif output_format == 'parquet':
+        remove_partition(store_root(),'filtered_nc',date)
+    return None
+
+
+def main(argv=None):
+    '''
+
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        None
+
+    '''
+
+    args = get_args(argv)
+    if args.start is not None:
+        months = month_range(args.start,args.end)
+    else:
+        months = [(str(args.year),args.month)]
+    mode = 'resume' if args.resume else 'force' if args.force else 'incremental'
+
+    configure('sat_processing',args.metrics)
+    with profiled(args.profile):
+        satellite_range_cleaning(months,args.workers,None if args.no_catalog else args.catalog,args.format,args.manifest,mode,
+                                 None if args.no_cache else args.cache,args.cache_size,args.window)
+    finish()
+    return None
 
 
+if __name__ == "__main__":
+    main()
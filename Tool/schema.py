@@ -0,0 +1,168 @@
+## This python script defines the in-memory layout of the satellite and ferry dataframes shared by all
+## the scripts, and the helpers reading and writing the daily csv files in that layout.
+#
+## - the coordinates, chl-a and the other measurements (sat_kms, ...) are float32
+## - the times are int64 seconds since 1970-01-01 00:00:00 UTC, so the time windows are compared as
+##   integers
+## - the date and the starttime and endtime of the satellite pass, repeated on every pixel of a
+##   granule, are categorical (one small code per row)
+## A day of satellite pixels takes 15 bytes per row instead of 74 bytes with the date and times kept
+## as strings and the values as float64 (and more than 200 bytes with python string objects).
+#
+## The csv files keep their layout ('YYYY-MM-DD' dates and 'HH:MM:SS' times), the columns are
+## converted when the files are read and written. The end times written by the earlier versions of
+## sat_processing.py were computed as HHMMSS-1 and are invalid when the stop time ended with 00
+## seconds ('18:47:99' for 18:47:59), they are repaired when read.
+
+
+import numpy as np
+import pandas as pd
+
+SATELLITE_COLUMNS = ['date','starttime','endtime','latitude','longitude','chl']
+FERRY_COLUMNS = ['Date','Time','Latitude','Longitude','chl']
+DATE_COLUMNS = ['date','Date']
+TIME_COLUMNS = ['starttime','endtime','Time']
+PASS_COLUMNS = ['starttime','endtime'] # times shared by all the pixels of a granule
+FLOAT_COLUMNS = ['latitude','longitude','chl','Latitude','Longitude','sat_kms']
+
+
+def repair_time(text):
+    '''
+
+    Parameters:
+        text (str) : 'YYYY-MM-DD HH:MM:SS' or 'HH:MM:SS' time
+
+    Return:
+        text (str) : same time with the minutes and seconds above 59 (written as HHMMSS-1 by earlier
+                     versions, for example '18:47:99') replaced by 59
+
+    '''
+
+    head,_,clock = text.rpartition(" ")
+    fields = clock.split(":")
+    if len(fields) == 3 and (fields[1] > "59" or fields[2] > "59"):
+        clock = "{}:{}:{}".format(fields[0],min(fields[1],"59"),min(fields[2],"59"))
+        return "{} {}".format(head,clock) if head else clock
+    return text
+
+
+def to_epoch(dates,times):
+    '''
+
+    Parameters:
+        dates (str or pandas series) : dates ('YYYY-MM-DD')
+        times (str, timestamp or pandas series) : times ('HH:MM:SS'), timestamps or epoch seconds
+
+    Return:
+        epoch (int or numpy array) : seconds since 1970-01-01 00:00:00 UTC
+
+    '''
+
+    if isinstance(times,pd.Series):
+        if isinstance(times.dtype,pd.CategoricalDtype) or pd.api.types.infer_dtype(times,skipna=False) == 'integer':
+            ## Epochs of frames concatenated with different categories are kept as objects by pandas
+            times = pd.Series(np.asarray(times,dtype=np.int64) if pd.api.types.infer_dtype(times,skipna=False) == 'integer' else np.asarray(times),index=times.index)
+        if pd.api.types.is_integer_dtype(times):
+            return times.to_numpy(dtype=np.int64)
+        if pd.api.types.is_datetime64_any_dtype(times):
+            return times.values.astype('datetime64[s]').astype(np.int64)
+        ## The passes of a day share a few distinct times, only those are parsed
+        codes,stamps = pd.factorize(pd.Series(dates).astype(str).to_numpy(dtype=object)+" "+times.astype(str).to_numpy(dtype=object))
+        epoch = pd.to_datetime([repair_time(stamp) for stamp in stamps],format="%Y-%m-%d %H:%M:%S").values.astype('datetime64[s]').astype(np.int64)
+        return epoch[codes]
+    if isinstance(times,(int,np.integer)):
+        return int(times)
+    if isinstance(times,str):
+        times = repair_time("{} {}".format(dates,times))
+    return pd.Timestamp(times).value // 10**9
+
+
+def typed(df):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : satellite (date, starttime, endtime, latitude, longitude, chl) or
+                                ferry (Date, Time, Latitude, Longitude, chl) dataframe, with any
+                                subset of these columns and other numeric columns
+
+    Return:
+        df (pandas dataframe) : dataframe with categorical dates, int64 epoch times (categorical for
+                                the times of the satellite pass) and float32 values
+
+    '''
+
+    date = next((column for column in DATE_COLUMNS if column in df.columns),None)
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in TIME_COLUMNS:
+            if not (isinstance(values.dtype,pd.CategoricalDtype) or pd.api.types.is_integer_dtype(values)):
+                values = pd.Series(to_epoch(df[date] if date is not None else "1970-01-01",values),index=df.index)
+            if column in PASS_COLUMNS and not isinstance(values.dtype,pd.CategoricalDtype):
+                values = values.astype('category')
+        elif column in DATE_COLUMNS:
+            if not isinstance(values.dtype,pd.CategoricalDtype):
+                values = values.astype(str).astype('category')
+        elif column in FLOAT_COLUMNS or pd.api.types.is_float_dtype(values):
+            if values.dtype != np.float32:
+                values = values.astype(np.float32)
+        columns[column] = values
+    return pd.DataFrame(columns,index=df.index)
+
+
+def csv_layout(df):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : typed satellite or ferry dataframe (refer typed)
+
+    Return:
+        df (pandas dataframe) : copy of the dataframe with 'HH:MM:SS' times, as written in the csv files
+
+    '''
+
+    df = df.copy()
+    for column in TIME_COLUMNS:
+        if column not in df.columns:
+            continue
+        if isinstance(df[column].dtype,pd.CategoricalDtype):
+            ## Only the distinct times of the passes are formatted
+            categories = df[column].cat.categories
+            df[column] = df[column].cat.rename_categories(pd.to_datetime(np.asarray(categories,dtype=np.int64),unit='s').strftime("%H:%M:%S"))
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column].to_numpy(dtype=np.int64),unit='s').strftime("%H:%M:%S")
+    return df
+
+
+def read_frame(path,columns=None):
+    '''
+
+    Parameters:
+        path (str) : daily csv file of satellite or ferry data
+        columns (list of str) : columns to read, None for every column
+
+    Return:
+        df (pandas dataframe) : typed dataframe (refer typed)
+
+    '''
+
+    ## The unnamed index column written with the files is skipped and the values are parsed as float32
+    usecols = lambda column: not column.startswith('Unnamed') and (columns is None or column in columns)
+    df = pd.read_csv(path,usecols=usecols,dtype=dict((column,np.float32) for column in FLOAT_COLUMNS))
+    return typed(df)
+
+
+def write_frame(df,path):
+    '''
+
+    Parameters:
+        df (pandas dataframe) : typed satellite or ferry dataframe (refer typed)
+        path (str) : daily csv file
+
+    Return:
+        None
+
+    '''
+
+    csv_layout(df).to_csv(path)
+    return None
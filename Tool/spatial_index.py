@@ -0,0 +1,137 @@
+## This python script builds a spatial index (KD-tree) over the satellite pixels of a day.
+#
+## The pixels are converted to points on the unit sphere, so that the straight-line (chord) distance
+## between two points increases with their great-circle distance. A radius query first collects
+## the candidate pixels from the tree with a small margin for the flattening of the earth, and the
+## exact ellipsoidal distances (refer geodesy.py) are computed only for those candidates. Radius and
+## k-nearest queries take logarithmic time instead of computing the distance of every pixel.
+#
+## The index of a day file (or of every satellite pass of it) is cached in memory, so sweeping the radius or testing many candidate
+## centres does not rebuild it.
+
+
+import collections
+import os
+import numpy as np
+from geodesy import EARTH_RADIUS_KM, distance_km
+
+RADIUS_MARGIN = 1.01 # the ellipsoidal distances differ from the spherical ones by less than 1 %
+CACHE_SIZE = 64 # number of day files whose index is kept in memory
+
+PixelIndex = collections.namedtuple('PixelIndex',['tree','latitude','longitude'])
+
+_cache = collections.OrderedDict()
+
+
+def unit_vectors(latitude,longitude):
+    '''
+
+    Parameters:
+        latitude (float or numpy array) : latitudes (degrees)
+        longitude (float or numpy array) : longitudes (degrees)
+
+    Return:
+        xyz (numpy array) : points on the unit sphere, one row per coordinate
+
+    '''
+
+    lat = np.radians(np.atleast_1d(np.asarray(latitude,dtype=np.float64)))
+    lon = np.radians(np.atleast_1d(np.asarray(longitude,dtype=np.float64)))
+    return np.column_stack((np.cos(lat)*np.cos(lon),np.cos(lat)*np.sin(lon),np.sin(lat)))
+
+
+def build_index(latitude,longitude):
+    '''
+
+    Parameters:
+        latitude (numpy array) : latitudes (degrees) of the satellite pixels
+        longitude (numpy array) : longitudes (degrees) of the satellite pixels
+
+    Return:
+        index (PixelIndex) : KD-tree over the pixels together with their coordinates
+
+    '''
+
+    latitude = np.asarray(latitude,dtype=np.float64)
+    longitude = np.asarray(longitude,dtype=np.float64)
+    ## scipy is imported by the first index built, importing this script stays fast
+    from scipy.spatial import cKDTree
+    return PixelIndex(cKDTree(unit_vectors(latitude,longitude)),latitude,longitude)
+
+
+def day_index(path,sat_df,part=None):
+    '''
+
+    Parameters:
+        path (str) : file (or partition directory) from which the satellite pixels were read
+        sat_df (pandas dataframe) : satellite pixels of the day (latitude, longitude), or of one part of the day
+        part (hashable) : part of the day the pixels belong to (for example the times of a satellite
+                          pass), None for all the pixels of the file
+
+    Return:
+        index (PixelIndex) : index of the pixels, built once per version of the file and part
+
+    '''
+
+    stat = os.stat(path)
+    key = (path,stat.st_mtime,len(sat_df),part)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    index = build_index(sat_df['latitude'].to_numpy(),sat_df['longitude'].to_numpy())
+    _cache[key] = index
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return index
+
+
+def _chord(radius_km):
+    return 2.0*np.sin(np.minimum(radius_km/(2.0*EARTH_RADIUS_KM),np.pi/2))
+
+
+def query_radius(index,lat,lon,radius_km):
+    '''
+
+    Parameters:
+        index (PixelIndex) : index of the satellite pixels
+        lat (float) : latitude (degrees) of the centre
+        lon (float) : longitude (degrees) of the centre
+        radius_km (float) : radius (km) around the centre
+
+    Return:
+        idx (numpy array) : positions of the pixels within the radius, sorted by distance
+        distance (numpy array) : ellipsoidal distances (km) of these pixels from the centre
+
+    '''
+
+    centre = unit_vectors(lat,lon)[0]
+    candidates = np.asarray(index.tree.query_ball_point(centre,_chord(radius_km*RADIUS_MARGIN)),dtype=np.int64)
+    distance = distance_km(index.latitude[candidates],index.longitude[candidates],lat,lon)
+    keep = distance <= radius_km
+    idx,distance = candidates[keep],distance[keep]
+    order = np.lexsort((idx,distance))
+    return idx[order],distance[order]
+
+
+def query_nearest(index,lat,lon,k=1):
+    '''
+
+    Parameters:
+        index (PixelIndex) : index of the satellite pixels
+        lat (float or numpy array) : latitudes (degrees) of the query points
+        lon (float or numpy array) : longitudes (degrees) of the query points
+        k (int) : number of nearest pixels returned for every query point
+
+    Return:
+        idx (numpy array) : positions of the k nearest pixels (shape: query points x k)
+        distance (numpy array) : ellipsoidal distances (km) of these pixels from the query points
+
+    '''
+
+    k = min(k,len(index.latitude))
+    lat = np.atleast_1d(np.asarray(lat,dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon,dtype=np.float64))
+    _,idx = index.tree.query(unit_vectors(lat,lon),k=k)
+    idx = np.asarray(idx,dtype=np.int64).reshape(len(lat),k)
+    distance = distance_km(index.latitude[idx],index.longitude[idx],lat[:,None],lon[:,None])
+    return idx,distance
@@ -0,0 +1,171 @@
+## This python script generates synthetic input data with the same layout as the real inputs of the
+## processing scripts, so that the pipeline can be run and benchmarked (refer benchmark.py) without
+## access to /spectral/OLCI and to the ONC downloads.
+#
+## - Sentinel-3 Polymer granules : netcdf files named as the OLCI products parsed by sat_processing.py
+##   (S3A_OL_1_EFR____<start>_<stop>_<creation>_..._002.nc) holding 2D latitude, longitude and logchl
+##   arrays (rows x columns of the pushbroom sensor). The swath is slightly tilted like a real
+##   descending pass, the logchl values vary smoothly over the swath and a fraction of the pixels
+##   (land, clouds) hold the netcdf fill value which is discarded by the logchl threshold.
+## - ONC ferry exports : csv files with the 50 metadata lines, the header line and the unit line
+##   skipped by ferry_processing.py, followed by one record per second of a ferry sailing back and
+##   forth between Tsawwassen and Swartz Bay.
+
+
+import datetime
+import os
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+FILL_VALUE = 9.969209968386869e36 # default netcdf fill value of float variables
+TSAWWASSEN = (49.0069,-123.1320)
+SWARTZ_BAY = (48.6890,-123.4104)
+CROSSING_S = 5400 # duration (s) of a crossing between the terminals
+ONC_COLUMNS = ["Time UTC (yyyy-mm-ddThh:mm:ss.fffZ)","Chlorophyll (ug/l)","Chlorophyll QC Flag","Latitude (deg)","Latitude QC Flag",
+               "Longitude (deg)","Longitude QC Flag","Turbidity (NTU)","Turbidity QC Flag","Temperature (C)","Temperature QC Flag",
+               "Salinity (psu)","Salinity QC Flag"]
+
+
+def granule_file_name(start,duration_s=180):
+    '''
+
+    Parameters:
+        start (datetime) : sensing start time of the granule
+        duration_s (int) : sensing duration (seconds) of the granule
+
+    Return:
+        file_name (str) : name of the granule following the Sentinel-3 OLCI nomenclature
+
+    '''
+
+    stop = start + datetime.timedelta(seconds=duration_s)
+    creation = start + datetime.timedelta(days=1)
+    return "S3A_OL_1_EFR____{}_{}_{}_0179_033_070_1980_LN1_O_NT_002.nc".format(start.strftime("%Y%m%dT%H%M%S"),
+                                                                              stop.strftime("%Y%m%dT%H%M%S"),
+                                                                              creation.strftime("%Y%m%dT%H%M%S"))
+
+
+def write_granule(path,rows=1000,cols=600,lat_range=(48.4,49.3),lon_range=(-123.8,-122.7),fill_fraction=0.1,seed=0):
+    '''
+
+    Parameters:
+        path (str) : path of the netcdf file
+        rows (int) : number of rows (along track) of the swath
+        cols (int) : number of columns (across track) of the swath
+        lat_range (tuple) : (south, north) latitudes (degrees) covered by the swath
+        lon_range (tuple) : (west, east) longitudes (degrees) covered by the swath
+        fill_fraction (float) : fraction of the pixels holding the fill value (land, clouds)
+        seed (int) : seed of the random generator
+
+    Return:
+        path (str) : path of the netcdf file
+
+    '''
+
+    rng = np.random.default_rng(seed)
+    along = np.linspace(0.0,1.0,rows)[:,None]
+    across = np.linspace(0.0,1.0,cols)[None,:]
+    ## The swath is tilted by a few percent of its width, like a descending pass
+    latitude = lat_range[1] - (lat_range[1]-lat_range[0])*along - 0.05*(lat_range[1]-lat_range[0])*across
+    longitude = lon_range[0] + (lon_range[1]-lon_range[0])*across + 0.05*(lon_range[1]-lon_range[0])*along
+    logchl = (np.log10(2.0) + 0.3*np.sin(6.0*along)*np.cos(4.0*across) + rng.normal(0.0,0.05,(rows,cols)))
+    logchl[rng.random((rows,cols)) < fill_fraction] = FILL_VALUE
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    ds = xr.Dataset({'latitude':(('height','width'),latitude.astype(np.float32)),
+                     'longitude':(('height','width'),longitude.astype(np.float32)),
+                     'logchl':(('height','width'),logchl.astype(np.float32))})
+    ds.to_netcdf(path,encoding={name:{'_FillValue':None} for name in ds.data_vars})
+    return path
+
+
+def write_granules(folder,date,count=3,rows=1000,cols=600,seed=0):
+    '''
+
+    Parameters:
+        folder (str) : day folder of the granules (the granules are written in its 'polymer' sub-folder)
+        date (str) : date of capture of the granules ('YYYY-MM-DD')
+        count (int) : number of consecutive granules of the pass
+        rows (int) : number of rows of every swath
+        cols (int) : number of columns of every swath
+        seed (int) : seed of the random generator
+
+    Return:
+        paths (list of str) : paths of the netcdf files
+
+    '''
+
+    start = datetime.datetime.strptime(date+" 18:45:00","%Y-%m-%d %H:%M:%S")
+    paths = []
+    for i in range(count):
+        name = granule_file_name(start + datetime.timedelta(seconds=180*i))
+        paths.append(write_granule("{}/polymer/{}".format(folder,name),rows,cols,seed=seed+i))
+    return paths
+
+
+def ferry_records(date,records=86400,start_time="00:00:00",missing_fraction=0.01,seed=0):
+    '''
+
+    Parameters:
+        date (str) : date of the first record ('YYYY-MM-DD')
+        records (int) : number of records (one per second)
+        start_time (str) : time of the first record ('HH:MM:SS')
+        missing_fraction (float) : fraction of the records without chl-a value
+        seed (int) : seed of the random generator
+
+    Return:
+        df (pandas dataframe) : records with the columns of an ONC export
+
+    '''
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("{} {}".format(date,start_time))
+    seconds = np.arange(records)
+    times = (start + pd.to_timedelta(seconds,unit='s')).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    ## Position along the route, going back and forth between the terminals
+    phase = (seconds % (2*CROSSING_S))/float(CROSSING_S)
+    position = np.where(phase <= 1.0,phase,2.0-phase)
+    latitude = TSAWWASSEN[0] + (SWARTZ_BAY[0]-TSAWWASSEN[0])*position + rng.normal(0.0,2e-4,records)
+    longitude = TSAWWASSEN[1] + (SWARTZ_BAY[1]-TSAWWASSEN[1])*position + rng.normal(0.0,2e-4,records)
+    chl = rng.lognormal(np.log(2.0),0.4,records)
+    chl[rng.random(records) < missing_fraction] = np.nan
+    noise = rng.normal(0.0,1.0,(records,len(ONC_COLUMNS)-4))
+    df = pd.DataFrame({ONC_COLUMNS[0]:times,ONC_COLUMNS[1]:chl,ONC_COLUMNS[2]:noise[:,0],ONC_COLUMNS[3]:latitude,ONC_COLUMNS[4]:noise[:,1],
+                       ONC_COLUMNS[5]:longitude,ONC_COLUMNS[6]:noise[:,2]})
+    for i,name in enumerate(ONC_COLUMNS[7:]):
+        df[name] = noise[:,3+i]
+    return df
+
+
+def write_ferry_export(path,date,records=86400,start_time="00:00:00",seed=0):
+    '''
+
+    Parameters:
+        path (str) : path of the csv file
+        date (str) : date of the first record ('YYYY-MM-DD')
+        records (int) : number of records (one per second)
+        start_time (str) : time of the first record ('HH:MM:SS')
+        seed (int) : seed of the random generator
+
+    Return:
+        path (str) : path of the csv file
+
+    '''
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    df = ferry_records(date,records,start_time,seed=seed)
+    with open(path,'w') as file:
+        ## 50 lines of metadata, the header and the units, as in the exports of the ONC website
+        file.write("#\"Ocean Networks Canada Data Archive\"\n")
+        file.write("#\"Synthetic BC Ferries (Tsawwassen - Swartz Bay) fluorometer export\"\n")
+        for i in range(48):
+            file.write("#\"Metadata line {}\"\n".format(i+3))
+        file.write(",".join(ONC_COLUMNS)+"\n")
+        file.write(",".join(["unit"]*len(ONC_COLUMNS))+"\n")
+        df.to_csv(file,header=False,index=False)
+    return path
@@ -5,7 +5,9 @@
 ## To validate the dataset, it is first required to filter the data points for optimal solution
 
 ## Ferry data points are filtered such that the data points which are recorded within the time-window
-## of the satellite data points, are only considered
+## of the satellite data points, are only considered. A day can have several satellite passes
+## (Sentinel-3A and Sentinel-3B granules), every pass is validated with the ferry records of its own
+## time-window and the results have one row per pass
 
 ## Satellite data points are filtered according to the geographical location of the filtered ferry 
 ## data points such that the area covered by the filtered satellite data points can overlap with
@@ -13,26 +15,106 @@
 
 ## This python script also involves code to visualize the implementation of the algorithm geographically 
 
+## The functions can be imported and called from other python code (run main() for the command line),
+## folium is only imported when a map is drawn.
+
 import pandas as pd
 import numpy as np
-import math
 import os
-import datetime
-from geopy import distance
-import matplotlib.pyplot as plt
-import folium
-from folium import plugins
-from folium.plugins import HeatMap
-from folium.plugins import BoatMarker
-pd.options.mode.chained_assignment = None
+import time
+import argparse
+import functools
+import multiprocessing
+from columnar_store import partition_exists, partition_path, read_partition_path, store_root, write_partition
+from date_range import month_range
+from instrumentation import add_arguments, configure, finish, flush, increment, log, measured, merge_totals, profiled, stage
+from geodesy import distance_km
+from spatial_index import day_index, query_radius
+from bootstrap import bootstrap_oversampling, bootstrap_undersampling, summarize
+from ferry_track import FerryTrack, open_track, track_path, track_window, window_frame
+from paths import FERRY_DIR, SATELLITE_DIR, day_dir, day_file
+from matchup import MAX_KM, STAT_COLUMNS, match_pixels, regression_stats
+from schema import read_frame, to_epoch, write_frame
+
+MAX_TASKS_PER_CHILD = 20 # days validated by a worker process before it is replaced
+RESULT_COLUMNS = ['Date','Pass','Latitude','Longitude','Radius (Kms)','Correlation','CI low','CI high','Remarks']
+MAP_MODES = ['markers','heatmap','grid'] # rendering modes of the map (refer heatmap)
+MAX_MAP_POINTS = 2000 # pixels drawn for a day at most in the markers and heatmap modes
+MAP_CELL_KM = 1.0 # size of the cells of the grid mode
+KM_PER_DEGREE = 111.32 # length of one degree of latitude
+SWEEP_COLUMNS = ['Date','Pass','Radius factor','Latitude','Longitude','Radius (Kms)','Pixels','Correlation','CI low','CI high','Remarks']
+MATCHUP_COLUMNS = ['Date','Pass','Ferry time','Ferry latitude','Ferry longitude','Ferry chl','Satellite latitude','Satellite longitude',
+                   'Satellite chl','Pixels','Distance (Kms)','Time offset (s)']
+
+_log_lines = None # log messages of the day validated by a worker process (refer validate_day)
+
+
+def _folium():
+    ## folium is only needed to draw the map, it is imported on first use
+    import folium
+    import folium.plugins
+    return folium
+
+
+def radius_factors(text):
+    '''
+    Parameters
+        text (str) : comma separated radius factors ("1,2,3,4") or an inclusive range start:stop:step ("1:4:0.5")
+
+    Return
+        factors (list of floats) : sorted radius factors
+
+    '''
+    try:
+        if ':' in text:
+            start,stop,step = [float(x) for x in text.split(':')]
+            if step <= 0 or stop < start:
+                raise ValueError
+            factors = start + step*np.arange(int(np.floor((stop-start)/step + 1e-9))+1)
+        else:
+            factors = [float(x) for x in text.split(',') if x.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid radius factors {} (expected 1,2,3,4 or start:stop:step)".format(text))
+    factors = sorted(set(round(float(x),6) for x in factors))
+    if not factors or factors[0] <= 0:
+        raise argparse.ArgumentTypeError("radius factors must be positive")
+    return factors
 
-def get_args():
+
+def get_args(argv=None):
 
     parser = argparse.ArgumentParser(description="This script takes the arguments from user",formatter_class = argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("--month",'-m', type=str,required=True,choices=['01','02','03','04','05','06','07','08','09','10','11','12'], help="Months (type a desired month number in the range [01,12]")
-    parser.add_argument("--year",'-y', type=int, required=True, help="Type the desired year")
-    parser.add_argument("radius_factor", 'rf',typr=int, required=True, choices=[1,2,3,4], help="value of parameter to increase or decrease radius")
-    return parser.parse_args()
+    parser.add_argument("--month",'-m', type=str,choices=['01','02','03','04','05','06','07','08','09','10','11','12'], help="Months (type a desired month number in the range [01,12]")
+    parser.add_argument("--year",'-y', type=int, help="Type the desired year")
+    parser.add_argument("--start",'-s', type=str, help="First month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--end",'-e', type=str, help="Last month of a date range (YYYY-MM), used instead of --month/--year")
+    parser.add_argument("--workers",'-w', type=int, default=1, help="Number of worker processes validating the days")
+    radius = parser.add_mutually_exclusive_group(required=True)
+    radius.add_argument("--radius_factor", '-rf',type=int, choices=[1,2,3,4], help="value of parameter to increase or decrease radius")
+    radius.add_argument("--sweep", type=radius_factors, help="Radius factors evaluated in a single pass over the data, as a list (1,2,3,4) or an inclusive range (1:4:0.5)")
+    radius.add_argument("--matchup", action='store_true', help="Pair every ferry record of the satellite pass with its nearest satellite pixels instead of bootstrapping a circle of pixels")
+    parser.add_argument("--max_km", type=float, default=MAX_KM, help="Largest distance (km) between a ferry record and its nearest pixel in the matchup mode")
+    parser.add_argument("--box", type=int, default=1, choices=[1,3,5], help="The box x box nearest pixels of a ferry record are averaged in the matchup mode")
+    parser.add_argument("--n_boot",'-nb',type=int, default=200, help="Number of bootstrap iterations used to find the correlation")
+    parser.add_argument("--seed",type=int, default=0, help="Seed of the random generator used for bootstrapping")
+    parser.add_argument("--format",'-f', type=str, default='csv', choices=['csv','parquet'], help="Format of the processed satellite and ferry data (parquet requires pyarrow)")
+    parser.add_argument("--map_mode", type=str, default='markers', choices=MAP_MODES, help="Rendering of the satellite pixels on the map: one marker per pixel, one heat layer per day or cells of a grid coloured by correlation")
+    parser.add_argument("--max_points", type=int, default=MAX_MAP_POINTS, help="Largest number of pixels drawn for a day in the markers and heatmap modes")
+    parser.add_argument("--cell_km", type=float, default=MAP_CELL_KM, help="Size (km) of the cells of the grid mode")
+    parser.add_argument("--no_map","--no-map", action='store_true', help="Do not render the map")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end have to be given together")
+    if args.start is None and (args.month is None or args.year is None):
+        parser.error("either --month and --year or --start and --end are required")
+    if args.workers < 1:
+        parser.error("--workers has to be at least 1")
+    if args.max_points < 1 or args.cell_km <= 0:
+        parser.error("--max_points and --cell_km have to be positive")
+    if args.max_km <= 0:
+        parser.error("--max_km has to be positive")
+    return args
 
 
 def write_log(content):
@@ -44,41 +126,155 @@ def write_log(content):
         None
 
     '''
+    if _log_lines is not None:
+        ## Worker processes return their messages, which are logged in the order of the days
+        _log_lines.append(content)
+        return None
+    ## The messages are buffered and written to the log file in blocks (refer instrumentation.py)
     fpath = "Logs/ExecutionLogs.txt"
-    file=open(fpath,'a')
-    file.write(content+"\n")
-    file.close()
+    log(fpath,content)
     print(content)
     return None
 
 
-def read_and_filter(satellite,ferry,radius):
+def pass_label(start,end):
+    '''
+    Parameters
+        start (int) : sensing start time of the satellite pass (epoch seconds)
+        end (int) : sensing end time of the satellite pass (epoch seconds)
+
+    Returns
+        label (str) : 'HH:MM:SS-HH:MM:SS' times of the pass
+
+    '''
+    return "{}-{}".format(time.strftime("%H:%M:%S",time.gmtime(start)),time.strftime("%H:%M:%S",time.gmtime(end)))
+
+
+def day_passes(sat_df):
+    '''
+    Parameters
+        sat_df : typed satellite dataframe of the day (refer schema.py)
+
+    Returns
+        passes (list of tuples) : (start, end, rows) of every satellite pass (overpass of Sentinel-3A or
+                                  Sentinel-3B) of the day in the order of their start time, rows being the
+                                  positions of the pixels of the pass in sat_df
+
+    '''
+    if len(sat_df) == 0:
+        return []
+    start = np.asarray(sat_df['starttime'],dtype=np.int64)
+    end = np.asarray(sat_df['endtime'],dtype=np.int64)
+    keys,codes = np.unique(np.column_stack((start,end)),axis=0,return_inverse=True)
+    codes = codes.reshape(-1)
+    order = np.argsort(codes,kind='stable')
+    bounds = np.searchsorted(codes[order],np.arange(len(keys)+1))
+    ## An overpass is split into 3 minute granules whose windows follow each other (the end time of a
+    ## granule is one second before the start time of the next one, refer granule_reader.parse_granule_name),
+    ## the granules whose windows touch or overlap are merged into one pass. The overpasses of Sentinel-3A
+    ## and Sentinel-3B are never contiguous in time, so the platform does not have to be compared.
+    passes = []
+    first = 0
+    pass_end = keys[0,1]
+    for k in range(1,len(keys)+1):
+        if k < len(keys) and keys[k,0] <= pass_end+1:
+            pass_end = max(pass_end,keys[k,1])
+            continue
+        passes.append((int(keys[first,0]),int(pass_end),order[bounds[first]:bounds[k]]))
+        if k < len(keys):
+            first = k
+            pass_end = keys[k,1]
+    return passes
+
+
+def read_day(satellite,ferry):
+    '''
+    Parameters
+        satellite (str): csv file path (or partition directory of the columnar store) of cleaned satellite data of the respective date
+        ferry (str or FerryTrack) : csv file path (or partition directory of the columnar store) for cleaned ferry data of the respective date,
+                                    or the time-sorted ferry track of the month (refer ferry_track.py)
+
+    Returns
+        sat_df : typed satellite dataframe of the day (refer schema.py)
+        passes (list of tuples) : (start, end, rows, ferry_filtered) of every satellite pass of the day (refer day_passes),
+                                  ferry_filtered being the typed ferry dataframe of the records within the time-window of the pass
+
+    '''
+    with stage('satellite_read') as counts:
+        if os.path.isdir(satellite):
+            sat_df = read_partition_path(satellite,'filtered_nc')
+        else:
+            sat_df = read_frame(satellite)
+        counts['rows_out'] = len(sat_df)
+
+    # Filtering relevant ferry points in the time-window in which push broom sensor scanned the area
+    # (the times are epoch seconds). The records from the first to the last pass of the day are read
+    # once, sorted by time, and the window of every pass is found in them by binary search
+    passes = day_passes(sat_df)
+    if not passes:
+        return sat_df,[]
+    first = min(start for start,_,_ in passes)
+    last = max(end for _,end,_ in passes)
+    with stage('ferry_read') as counts:
+        if isinstance(ferry,FerryTrack):
+            ## The records of the day are sliced from the time-sorted track by binary search
+            ferry_day = window_frame(track_window(ferry,first,last))
+        elif os.path.isdir(ferry):
+            ## Only the ferry records of the satellite passes are read from the columnar store
+            ferry_day = read_partition_path(ferry,'clean_ferry',filters=[('time','>=',pd.Timestamp(first,unit='s')),('time','<=',pd.Timestamp(last,unit='s'))])
+        else:
+            ferry_df = read_frame(ferry)
+            mask = (ferry_df['Time'] >= first) &(ferry_df['Time'] <= last)
+            ferry_day = ferry_df.loc[mask]
+        counts['rows_out'] = len(ferry_day)
+    ferry_day = ferry_day.reset_index(drop = True)
+    times = ferry_day['Time'].to_numpy(dtype=np.int64)
+    if np.any(times[1:] < times[:-1]):
+        ferry_day = ferry_day.iloc[np.argsort(times,kind='stable')].reset_index(drop = True)
+        times = ferry_day['Time'].to_numpy(dtype=np.int64)
+    lo = np.searchsorted(times,[start for start,_,_ in passes],side='left')
+    hi = np.searchsorted(times,[end for _,end,_ in passes],side='right')
+    return sat_df,[(start,end,rows,ferry_day.iloc[lo[k]:hi[k]].reset_index(drop = True)) for k,(start,end,rows) in enumerate(passes)]
+
+
+def rank_day(satellite,ferry,radius):
     '''
     Parameters 
-        satellite (str): csv file path of cleaned satellite data of the respective date
-        ferry (str) : csv file path for cleaned ferry data of the respective date
-        radius (int) : parameter to increase or decrease radius around the ferry location
+        satellite (str): csv file path (or partition directory of the columnar store) of cleaned satellite data of the respective date
+        ferry (str or FerryTrack) : csv file path (or partition directory of the columnar store) for cleaned ferry data of the respective date,
+                                    or the time-sorted ferry track of the month (refer ferry_track.py)
+        radius (float) : largest parameter to increase or decrease radius around the ferry location
     
     Returns
-        sat_filtered : filtered satellite dataframe
+        ranked (list of tuples) : (start, end, sat_ranked, ferry_filtered, mid_lat, mid_lon, half_distance) of every
+                                  satellite pass of the day (refer rank_pass)
+    
+    '''
+    sat_df,passes = read_day(satellite,ferry)
+    ranked = []
+    for start,end,rows,ferry_filtered in passes:
+        ranked.append((start,end)+rank_pass(satellite,sat_df.iloc[rows],ferry_filtered,radius,(start,end)))
+    return ranked
+
+
+def rank_pass(satellite,sat_pass,ferry_filtered,radius,part=None):
+    '''
+    Parameters 
+        satellite (str): csv file path (or partition directory of the columnar store) from which the satellite pixels were read
+        sat_pass : satellite dataframe of the pixels of the pass
+        ferry_filtered : ferry dataframe of the records within the time-window of the pass
+        radius (float) : largest parameter to increase or decrease radius around the ferry location
+        part (tuple) : (start, end) times of the pass, the spatial index of its pixels is cached under them
+    
+    Returns
+        sat_ranked : satellite dataframe of the pixels within the largest radius, sorted by their distance (sat_kms) from the ferry,
+                     None if the ferry has no record during the pass
         ferry_filtered : filtered ferry dataframe
         mid-lat (int) : mean latitude value
         mid-lon (int) : mean longitude value
-        radius_range (int) : range of the radius around imaginary circle 
+        half_distance (float) : half of the distance traversed by the ferry, the radius around the imaginary circle is radius*half_distance
     
     '''
-    sat_df = pd.read_csv(satellite)
-    ferry_df = pd.read_csv(ferry)
-    sat_df = sat_df.drop(['Unnamed: 0'],axis =1)
-    ferry_df = ferry_df.drop(['Unnamed: 0'],axis =1)
-
-    # Filtering relevant ferry points in the 3 minute window in which push broom sensor scanned the area
-    start_time = pd.unique(pd.Series(sat_df.starttime))
-    end_time = pd.unique(pd.Series(sat_df.endtime))
-    mask = (ferry_df['Time'] >= start_time[0]) &(ferry_df['Time'] <= end_time[0])
-    ferry_filtered = ferry_df.loc[mask]
-    ferry_filtered['chl'] = np.float64((ferry_filtered['chl']))
-    ferry_filtered = ferry_filtered.reset_index(drop = True)
     # chl_column = ferry_filtered["chl"]
     # max_ferry_chla = chl_column.max()
     if len(ferry_filtered)==0:
@@ -89,79 +285,152 @@ def read_and_filter(satellite,ferry,radius):
     last_lon = ferry_filtered.loc[len(ferry_filtered)-1,'Longitude']
     mid_lat = np.median(ferry_filtered['Latitude'].astype('float'))
     mid_lon = np.median(ferry_filtered['Longitude'].astype('float'))
-    distance_traversed = distance.distance((first_lat, first_lon),(last_lat, last_lon)).km
+    distance_traversed = float(distance_km(first_lat,first_lon,last_lat,last_lon))
     
-    sat_df['sat_kms'] = sat_df.apply((lambda row: distance.distance((row['latitude'], row['longitude']),
-            (mid_lat,mid_lon)).km),axis=1)
-    sat_df = sat_df.sort_values(by = ['sat_kms'])
     if distance_traversed < 1.0:
         write_log("Ferry is standing still at one of the terminal and has not moved")
         distance_traversed = 2.0
-    radius_range = radius*(distance_traversed/2.0)
-    mask_kms = sat_df['sat_kms']<=radius*(distance_traversed/2.0)
-    sat_filtered = sat_df.loc[mask_kms].reset_index(drop = True)
+    half_distance = distance_traversed/2.0
+
+    # Only the satellite pixels within the radius are looked up in the spatial index of the day
+    # (refer spatial_index.py) and sorted by their distance from the median ferry location
+    with stage('distance',rows_in=len(sat_pass)) as counts:
+        idx,sat_kms = query_radius(day_index(satellite,sat_pass,part),mid_lat,mid_lon,radius*half_distance)
+        counts['rows_out'] = len(idx)
+    sat_ranked = sat_pass.iloc[idx].reset_index(drop = True)
+    sat_ranked['sat_kms'] = sat_kms
+    return sat_ranked,ferry_filtered,mid_lat,mid_lon,half_distance
+
+
+def within_radius(sat_ranked,radius_range):
+    '''
+    Parameters
+        sat_ranked : satellite dataframe sorted by the distance (sat_kms) from the ferry (refer rank_day)
+        radius_range (float) : range of the radius around imaginary circle
 
-    # mask_chl = sat_filtered['chl']<= max_ferry_chla
-    # sat_filtered = sat_filtered.loc[mask_chl].reset_index(drop=True)
-    # sat_filtered.drop_duplicates(inplace = True)
-    # if len(sat_filtered)==0:
-        # return None, None,0,0,0
-    return sat_filtered,ferry_filtered,mid_lat,mid_lon,radius_range
+    Returns
+        sat_filtered : satellite pixels within the radius (the nearest rows of sat_ranked)
 
-def undersampling(sat_filtered,ferry_filtered):
+    '''
+    n = np.searchsorted(sat_ranked['sat_kms'].to_numpy(),radius_range,side='right')
+    return sat_ranked.iloc[:n]
+
+
+def read_and_filter(satellite,ferry,radius):
+    '''
+    Parameters 
+        satellite (str): csv file path (or partition directory of the columnar store) of cleaned satellite data of the respective date
+        ferry (str or FerryTrack) : csv file path (or partition directory of the columnar store) for cleaned ferry data of the respective date,
+                                    or the time-sorted ferry track of the month (refer ferry_track.py)
+        radius (int) : parameter to increase or decrease radius around the ferry location
+    
+    Returns
+        filtered (list of tuples) : (start, end, sat_filtered, ferry_filtered, mid_lat, mid_lon, radius_range) of every
+                                    satellite pass of the day with ferry records
+                                    start, end (int) : times of the pass (epoch seconds)
+                                    sat_filtered : filtered satellite dataframe
+                                    ferry_filtered : filtered ferry dataframe
+                                    mid-lat (int) : mean latitude value
+                                    mid-lon (int) : mean longitude value
+                                    radius_range (int) : range of the radius around imaginary circle 
+    
+    '''
+    filtered = []
+    for start,end,sat_filtered,ferry_filtered,mid_lat,mid_lon,half_distance in rank_day(satellite,ferry,radius):
+        if sat_filtered is None:
+            continue
+        radius_range = radius*half_distance
+
+        # mask_chl = sat_filtered['chl']<= max_ferry_chla
+        # sat_filtered = sat_filtered.loc[mask_chl].reset_index(drop=True)
+        # sat_filtered.drop_duplicates(inplace = True)
+        # if len(sat_filtered)==0:
+            # return None, None,0,0,0
+        filtered.append((start,end,sat_filtered,ferry_filtered,mid_lat,mid_lon,radius_range))
+    return filtered
+
+def undersampling(sat_filtered,ferry_filtered,n_boot=10,rng=None):
     '''
     
     Parameters :
         sat_filtered : filtered satellite dataframe
         ferry_filtered : filtered ferry dataframe
+        n_boot (int) : number of iterations
+        rng (numpy Generator) : seeded random generator, a generator seeded with 0 if None
     
     Return :
-        avg_corr (int) : average correlation between the selected ferry data points and satellite data points
+        avg_corr (numpy array) : correlations between the satellite data points and the selected ferry data points of every iteration
     
     '''
-    avg_corr_ = []
-    # print(len(sat_filtered),len(ferry_filtered))
-    for num in range(1,11):
-        
-        ferry_sample = ferry_filtered.sample(len(sat_filtered),random_state=num)
-    #     write_log(ferry_sample.info())
-    #     write_log("random_state {}".format(num))
-        X = (sat_filtered['chl'])
-        Y = (ferry_sample['chl'])
-        corr = X.corr(Y)
-        
-        if not math.isnan(corr) :
-            avg_corr_.append(corr)
-            
-    return avg_corr_
-
-def oversampling(sat_filtered,ferry_filtered):
+    # All the iterations are drawn and correlated at once (refer bootstrap.py)
+    avg_corr_ = bootstrap_undersampling(sat_filtered['chl'].to_numpy(),ferry_filtered['chl'].to_numpy(),n_boot,rng)
+    return avg_corr_[~np.isnan(avg_corr_)]
+
+def oversampling(sat_filtered,ferry_filtered,n_boot=200,rng=None):
     '''
 
     Parameters :
         sat_filtered : filtered satellite dataframe
         ferry_filtered : filtered ferry dataframe
+        n_boot (int) : number of iterations
+        rng (numpy Generator) : seeded random generator, a generator seeded with 0 if None
     
     Return :
-        avg_corr (float) : average correlation between the selected ferry data points and satellite data points
+        avg_corr (numpy array) : correlations between the selected satellite data points and the ferry data points of every iteration
+        sat_sample : satellite data points selected in the last iteration
     
     '''
 
-    avg_corr = []
-    for num in range(200):
-        # print(len(sat_filtered),num)
-        sat_sample = sat_filtered.sample(len(ferry_filtered),random_state=num,replace=True)
-    #     write_log("random_state {}".format(num))
-        print(sat_sample.shape)
-        X = (sat_sample['chl'])
-        Y = (ferry_filtered['chl'])
-        corr = X.corr(Y)
-        avg_corr.append(corr)
-        
+    # All the iterations are drawn and correlated at once (refer bootstrap.py)
+    avg_corr,last_idx = bootstrap_oversampling(sat_filtered['chl'].to_numpy(),ferry_filtered['chl'].to_numpy(),n_boot,rng)
+    sat_sample = sat_filtered.iloc[last_idx]
     return avg_corr,sat_sample
 
 
-def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color):
+def level_of_detail(sat_filtered,max_points=MAX_MAP_POINTS):
+    '''
+
+    Parameters :
+        sat_filtered : filtered satellite dataframe
+        max_points (int) : largest number of pixels drawn for a day, None to draw every pixel
+
+    Return :
+        sat_filtered : evenly spaced pixels of the day, at most max_points
+
+    '''
+
+    if max_points is None or len(sat_filtered) <= max_points:
+        return sat_filtered
+    return sat_filtered.iloc[np.unique(np.linspace(0,len(sat_filtered)-1,max_points).astype(np.int64))]
+
+
+def grid_cells(latitude,longitude,cell_km=MAP_CELL_KM):
+    '''
+
+    Parameters :
+        latitude (numpy array) : latitudes (degrees) of the pixels
+        longitude (numpy array) : longitudes (degrees) of the pixels
+        cell_km (float) : size (km) of the square cells of the grid
+
+    Return :
+        cells (list of tuples) : (lat_min, lat_max, lon_min, lon_max, pixels) of every cell holding pixels
+
+    '''
+
+    latitude = np.asarray(latitude,dtype=np.float64)
+    longitude = np.asarray(longitude,dtype=np.float64)
+    if latitude.size == 0:
+        return []
+    ## The cells have the same size (in km) in both directions at the latitude of the pixels
+    dlat = cell_km/KM_PER_DEGREE
+    dlon = cell_km/(KM_PER_DEGREE*np.cos(np.radians(np.median(latitude))))
+    rows = np.floor(latitude/dlat).astype(np.int64)
+    cols = np.floor(longitude/dlon).astype(np.int64)
+    keys,pixels = np.unique(np.column_stack((rows,cols)),axis=0,return_counts=True)
+    return [(row*dlat,(row+1)*dlat,col*dlon,(col+1)*dlon,int(n)) for (row,col),n in zip(keys,pixels)]
+
+
+def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color,mode='markers',max_points=MAX_MAP_POINTS,cell_km=MAP_CELL_KM):
 
     '''
 
@@ -173,6 +442,10 @@ def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color):
         corr (float) : average correlation between the selected ferry data points and satellite data points
         map_ferry (object) : contains information for visualization of the data points on the map
         boat_color (list of strings) : colors for the boat markers 
+        mode (str) : 'markers' (one circle per pixel), 'heatmap' (one heat layer per day) or
+                     'grid' (pixels binned into cells coloured by correlation)
+        max_points (int) : largest number of pixels drawn for a day in the markers and heatmap modes
+        cell_km (float) : size (km) of the cells of the grid mode
     
     Return:
         map_ferry (object) : representation of the data points on the map
@@ -182,6 +455,7 @@ def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color):
 
     
     ## Plotting heat map using folium
+    folium = _folium()
     if map_ferry == None:
        map_ferry = folium.Map(location=[lat,lon],zoom_start=10)
     
@@ -200,13 +474,35 @@ def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color):
     else:
         color = 'greenyellow'
         ps = 'Very strong correlation'
-    BoatMarker(
+    date = sat_filtered.iloc[0]['date']
+    folium.plugins.BoatMarker(
         location=[lat,lon],
-        popup = (sat_filtered.iloc[0]['date'],ps,"Correlation = {}".format(corr)),
+        popup = (date,ps,"Correlation = {}".format(corr)),
         heading=40,
         wind_heading=46,
         wind_speed=25,
         color=boat_color).add_to(map_ferry)
+
+    ## The pixels of every satellite pass are drawn in their own layer, which can be hidden from the layer control
+    name = str(date)
+    if 'starttime' in sat_filtered.columns:
+        name = "{} {}".format(date,time.strftime("%H:%M:%S",time.gmtime(int(sat_filtered.iloc[0]['starttime']))))
+    day_layer = folium.FeatureGroup(name=name).add_to(map_ferry)
+    if mode == 'grid':
+        ## The pixels are binned here, only one polygon per cell is written to the map
+        features = []
+        for lat_min,lat_max,lon_min,lon_max,pixels in grid_cells(sat_filtered['latitude'],sat_filtered['longitude'],cell_km):
+            features.append({'type':'Feature','properties':{'pixels':pixels},
+                             'geometry':{'type':'Polygon','coordinates':[[[lon_min,lat_min],[lon_max,lat_min],[lon_max,lat_max],[lon_min,lat_max],[lon_min,lat_min]]]}})
+        folium.GeoJson({'type':'FeatureCollection','features':features},
+                       style_function=lambda feature,color=color: {'color':color,'weight':0.5,'fillColor':color,'fillOpacity':0.6},
+                       tooltip=folium.GeoJsonTooltip(fields=['pixels'])).add_to(day_layer)
+        return map_ferry
+
+    sat_filtered = level_of_detail(sat_filtered,max_points)
+    if mode == 'heatmap':
+        folium.plugins.HeatMap(list(zip(sat_filtered['latitude'],sat_filtered['longitude'])),radius=8).add_to(day_layer)
+        return map_ferry
     
     for lat,lon in zip(sat_filtered['latitude'],sat_filtered['longitude']):
         folium.CircleMarker([lat, lon],
@@ -215,88 +511,495 @@ def heatmap(sat_filtered,ferry_filtered,lat,lon,corr,map_ferry,boat_color):
                                 fill=True,
                                 fill_opacity=0.7,
                                 fill_color=color,
-                               ).add_to(map_ferry)
+                               ).add_to(day_layer)
     
     return map_ferry
 
 
-map_ferry = None
-def execute(year,month,boat_color,map_ferry,radius_factor):
+def day_sources(year,month,cdate,data_format,track):
     '''
     Parameters:
-        year (str) : desired year for validating the data
-        month (str) : desired month for validating the data
-        boat_color (list of strings) : colors for the boat markers
-        map_ferry (object) : contains information for visualization of the data points on the map
-        radius_factor (int) : parameter to increase or decrease radius around the ferry location
+        year (str) : year of the day
+        month (str) : month of the day
+        cdate (str) : day of the month
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+        track (FerryTrack) : time-sorted ferry track of the month, None if it does not exist
 
     Returns:
-        map_ferry (object) : contains information for visualization of the data points on the map
-        results_df (dataframe) :records of the results obtained for correlation for different instances
+        satellite (str) : csv file path (or partition directory) of the cleaned satellite data
+        ferry (str or FerryTrack) : csv file path (or partition directory) of the cleaned ferry data, or the ferry track
+        satellite_exists (bool) : True if satellite data is available for the day
+        ferry_exists (bool) : True if ferry data is available for the day
 
     '''
+    current_date = year+"-"+month+"-"+cdate
+    if data_format == 'parquet':
+        satellite = partition_path(store_root(),'filtered_nc',current_date)
+        ferry = partition_path(store_root(),'clean_ferry',current_date)
+        satellite_exists = partition_exists(store_root(),'filtered_nc',current_date)
+        ferry_exists = partition_exists(store_root(),'clean_ferry',current_date)
+    else:
+        satellite = day_file(SATELLITE_DIR,'filtered_nc',current_date)
+        ferry = day_file(FERRY_DIR,'clean_ferry_data',current_date)
+        satellite_exists = os.path.exists(satellite)
+        ferry_exists = os.path.exists(ferry)
+    if track is not None:
+        ## The ferry records are taken from the time-sorted track of the month (refer ferry_track.py)
+        ferry = track
+        ferry_exists = track_window(track,to_epoch(current_date,"00:00:00"),to_epoch(current_date,"23:59:59")).epoch.size > 0
+    return satellite,ferry,satellite_exists,ferry_exists
+
+
+def validate_day(task):
+    '''
+    Parameters:
+        task (tuple) : (year, month, cdate, radius_factors, data_format, n_boot, seed, save_filtered, map_layer) of the day
+                       year (str), month (str), cdate (str) : day to validate
+                       radius_factors (list) : parameters to increase or decrease radius around the ferry location
+                       data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+                       n_boot (int) : number of bootstrap iterations used to find the correlation
+                       seed (int) : seed of the run, combined with the date and the radius factor
+                       save_filtered (bool) : True to save the filtered satellite and ferry data of the day
+                       map_layer (bool) : True to return the pixels drawn on the map
 
-    results_df = pd.DataFrame(columns=['Date','Latitude','Longitude','Radius (Kms)','Correlation','Remarks'])
-    for i in range(1,32):
+    Returns:
+        log_lines (list of str) : log messages of the day
+        records (list of dicts) : results of the day, one record per satellite pass and radius factor
+        layers (list of tuples) : (satellite pixels, latitude, longitude, correlation) drawn on the map for the
+                                  largest radius factor, one per satellite pass with a correlation
+
+    '''
+
+    global _log_lines
+    year,month,cdate,radius_factors,data_format,n_boot,seed,save_filtered,map_layer = task
+    radius_factors = sorted(radius_factors)
+    _log_lines = []
+    records = []
+    layers = []
+    try:
         write_log("********************************\n")
-                
-        if i <10:
-            cdate = "0"+str(i)
-        else:
-            cdate = str(i)
         current_date = year+"-"+month+"-"+cdate
         write_log("Processing data from {}/{}/{}".format(year,month,cdate))
+        track = open_track(track_path(year,month))
+        satellite,ferry,satellite_exists,ferry_exists = day_sources(year,month,cdate,data_format,track)
 
-        if not os.path.exists("../Processed_nc_to_csv/{}/{}/{}/filtered_nc_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate)):
+        remarks = None
+        ranked = []
+        if not satellite_exists:
             remarks = "The satellite did not pass over the ferry route between Vancouver and Victoria on {}-{}-{}".format(cdate,month,year)
+        elif not ferry_exists:
+            remarks = "Ferry data from {}/{}/{} is not available".format(year,month,cdate)
+        else:
+            ## Every day is read once and the satellite pixels of every pass (Sentinel-3A and Sentinel-3B
+            ## granules) are ranked by distance for the largest radius, the pixels within a smaller radius
+            ## are the nearest rows of the ranking
+            try:
+                ranked = rank_day(satellite,ferry,radius_factors[-1])
+            except ValueError as error:
+                ## A malformed file only fails its own day
+                remarks = "The processed data from {}/{}/{} could not be read ({})".format(year,month,cdate,str(error).splitlines()[0])
+                ranked = None
+            if ranked is not None and not ranked:
+                remarks = "The satellite did not pass over the ferry route between Vancouver and Victoria on {}-{}-{}".format(cdate,month,year)
+        if remarks is not None:
             write_log(remarks)
-            results_df=results_df.append({"Date":current_date,"Latitude":"-","Longitude":"-",'Radius (Kms)':"-","Correlation":"-","Remarks":remarks},ignore_index=True)
-            continue
+            for radius_factor in radius_factors:
+                records.append({"Date":current_date,"Pass":"-","Radius factor":radius_factor,"Latitude":"-","Longitude":"-",'Radius (Kms)':"-","Pixels":0,"Correlation":"-","CI low":"-","CI high":"-","Remarks":remarks})
+            return _log_lines,records,layers
+
+        ## Every pass is compared with the ferry records of its own time-window
+        saved = []
+        for start,end,sat_ranked,f,lat,lon,half_distance in ranked:
+            label = pass_label(start,end)
+            if len(ranked) > 1:
+                write_log("Satellite pass {}".format(label))
+            if sat_ranked is None:
+                remarks = "The ferry is not operating in the satellite pass duration or there are not enough chl-a values in satellite data which are less than maximum ferry chl-a"
+                write_log(remarks)
+                for radius_factor in radius_factors:
+                    records.append({"Date":current_date,"Pass":label,"Radius factor":radius_factor,"Latitude":"-","Longitude":"-",'Radius (Kms)':"-","Pixels":0,"Correlation":"-","CI low":"-","CI high":"-","Remarks":remarks})
+                continue
+            for radius_factor in radius_factors:
+                radiusrange = radius_factor*half_distance
+                s = within_radius(sat_ranked,radiusrange)
+                if len(s) == 0:
+                    remarks = "The satellite pass is taking the capture from the ferry route between Vancouver and Victoria but the position of ferry in that duration does not overlap with the area covered in satellite pass"
+                    write_log(remarks if len(radius_factors) == 1 else "Radius factor {} : {}".format(radius_factor,remarks))
+                    records.append({"Date":current_date,"Pass":label,"Radius factor":radius_factor,"Latitude":lat,"Longitude":lon,'Radius (Kms)':radiusrange,"Pixels":0,"Correlation":"-","CI low":"-","CI high":"-","Remarks":remarks})
+                    continue
+                ## The random generator depends only on the seed, the date, the start of the pass and the
+                ## radius factor, so that the results do not depend on the number of workers, on the order
+                ## in which the days are validated or on the other radius factors of a sweep
+                rng = np.random.default_rng([seed,int(year),int(month),int(cdate),int(round(radius_factor*1000)),start % 86400])
+                with stage('bootstrap',rows_in=len(s)) as counts:
+                    o_c,sat_oversample = oversampling(s,f,n_boot,rng)
+                    counts['rows_out'] = len(o_c)
+                if save_filtered:
+                    saved.append((s,f))
+
+                # o_c = undersampling(s,f)
+                #write_log(np.mean(o_c),np.std(o_c))
+                corr,corr_low,corr_high = summarize(o_c)
+                if len(radius_factors) > 1:
+                    write_log("Radius factor {} : {} satellite data points, correlation = {}".format(radius_factor,len(s),corr))
+                elif len(ranked) > 1:
+                    write_log("{} satellite data points, correlation = {}".format(len(s),corr))
+                records.append({"Date":current_date,"Pass":label,"Radius factor":radius_factor,"Latitude":lat,"Longitude":lon,'Radius (Kms)':radiusrange,"Pixels":len(s),"Correlation":corr,"CI low":corr_low,"CI high":corr_high,"Remarks":"-"})
+            if map_layer and records[-1]["Remarks"] == "-":
+                layers.append((s[['date','starttime','latitude','longitude']],lat,lon,records[-1]["Correlation"]))
+
+        ## The filtered data of all the passes of the day are saved together
+        if saved:
+            s = pd.concat([s for s,_ in saved],ignore_index=True)
+            f = pd.concat([f for _,f in saved],ignore_index=True)
+            with stage('filtered_write',rows_in=len(s)):
+                if data_format == 'parquet':
+                    write_partition(s,store_root(),'sat_filtered',current_date)
+                    write_partition(f,store_root(),'ferry_filtered',current_date)
+                    write_partition(s,store_root(),'sat_oversampled',current_date)
+                else:
+                    write_frame(s,day_file(SATELLITE_DIR,'sat_filtered',current_date))
+                    ## The filtered ferry data is compared with the filtered satellite data in distribution_plots.py
+                    if not os.path.isdir(day_dir(FERRY_DIR,current_date)):
+                        os.makedirs(day_dir(FERRY_DIR,current_date))
+                    write_frame(f,day_file(FERRY_DIR,'ferry_filtered',current_date))
+                    write_frame(s,day_file(SATELLITE_DIR,'sat_oversampled',current_date))
+        return _log_lines,records,layers
+    finally:
+        _log_lines = None
+
+
+def validate_days(months,radius_factors,data_format='csv',n_boot=200,seed=0,workers=1,save_filtered=False,map_layers=False):
+    '''
+    Parameters:
+        months (list of tuples) : (year, month) of every month to validate
+        radius_factors (list) : parameters to increase or decrease radius around the ferry location
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+        n_boot (int) : number of bootstrap iterations used to find the correlation
+        seed (int) : seed of the random generators used for bootstrapping
+        workers (int) : number of worker processes validating the days
+        save_filtered (bool) : True to save the filtered satellite and ferry data of every day
+        map_layers (bool) : True to return the pixels drawn on the map
 
-        if not os.path.exists("../Processed_ferry_to_csv/{}/{}/{}/clean_ferry_data_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate)):
-            remarks = "Ferry data from {}}/{}/{} is not available".format(year,month,cdate)
-            write_log(remarks)
-            results_df=results_df.append({"Date":current_date,"Latitude":"-","Longitude":"-",'Radius (Kms)':"-","Correlation":"-","Remarks":remarks},ignore_index=True)
-            continue
+    Returns:
+        records (list of dicts) : results of every day and radius factor, in the order of the days
+        layers (list of tuples) : data drawn on the map for every satellite pass with a correlation (refer validate_day)
 
-        s,f,lat,lon,radiusrange = read_and_filter("../Processed_nc_to_csv/{}/{}/{}/filtered_nc_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate),
-                        "../Processed_ferry_to_csv/{}/{}/{}/clean_ferry_data_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate),radius_factor)
-        if s is None:
-            remarks = "The ferry is not operating in the satellite pass duration or there are not enough chl-a values in satellite data which are less than maximum ferry chl-a"
-            write_log(remarks)
-            results_df=results_df.append({"Date":current_date,"Latitude":lat,"Longitude":lon,'Radius (Kms)':"-","Correlation":"-","Remarks":remarks},ignore_index=True)
-            continue
-        elif len(s) == 0:
-            remarks = "The satellite pass is taking the capture from the ferry route between Vancouver and Victoria but the position of ferry in that duration does not overlap with the area covered in satellite pass"
+    '''
+
+    tasks = []
+    for year,month in months:
+        for i in range(1,32):
+            tasks.append((year,month,"{:02d}".format(i),list(radius_factors),data_format,n_boot,seed,save_filtered,map_layers))
+
+    records = []
+    layers = []
+    for day_records,day_layers in map_days(validate_day,tasks,workers):
+        records.extend(day_records)
+        layers.extend(day_layers)
+    return records,layers
+
+
+def map_days(function,tasks,workers=1):
+    '''
+    Parameters:
+        function (function) : validates one day, returns its log messages followed by its results
+        tasks (list of tuples) : argument of the function for every day
+        workers (int) : number of worker processes validating the days
+
+    Returns:
+        results (generator of tuples) : results of every day (without the log messages), in the order of the tasks
+
+    '''
+
+    ### The days are validated independently by the worker processes and returned in the order of
+    ### submission, so the logs and the results are the same as for a serial run
+    ### The stages measured while validating a day are returned with its results (refer instrumentation.py)
+    pool = None
+    task = functools.partial(measured,function)
+    if workers > 1:
+        flush()
+        pool = multiprocessing.Pool(processes=workers,maxtasksperchild=MAX_TASKS_PER_CHILD)
+        results = pool.imap(task,tasks,chunksize=1)
+    else:
+        results = map(task,tasks)
+
+    completed = False
+    try:
+        for result,totals in results:
+            merge_totals(totals)
+            increment('days_validated')
+            for line in result[0]:
+                write_log(line)
+            yield result[1:]
+        completed = True
+    finally:
+        ## The days still queued are not validated once a day has failed (or the results are no longer read)
+        if pool is not None and completed:
+            pool.close()
+            pool.join()
+        elif pool is not None:
+            pool.terminate()
+
+
+def matchup_day(task):
+    '''
+    Parameters:
+        task (tuple) : (year, month, cdate, data_format, max_km, box) of the day
+                       year (str), month (str), cdate (str) : day to validate
+                       data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+                       max_km (float) : largest distance (km) between a ferry record and its nearest pixel
+                       box (int) : size of the neighbourhood of pixels averaged for every ferry record (refer matchup.py)
+
+    Returns:
+        log_lines (list of str) : log messages of the day
+        matchups (dataframe) : ferry records of the satellite passes paired with their satellite pixels, None if the day has none
+        records (list of dicts) : regression statistics of the matchups of every satellite pass of the day
+
+    '''
+
+    global _log_lines
+    year,month,cdate,data_format,max_km,box = task
+    _log_lines = []
+    try:
+        write_log("********************************\n")
+        current_date = year+"-"+month+"-"+cdate
+        write_log("Processing data from {}/{}/{}".format(year,month,cdate))
+        track = open_track(track_path(year,month))
+        satellite,ferry,satellite_exists,ferry_exists = day_sources(year,month,cdate,data_format,track)
+
+        remarks = None
+        passes = []
+        if not satellite_exists:
+            remarks = "The satellite did not pass over the ferry route between Vancouver and Victoria on {}-{}-{}".format(cdate,month,year)
+        elif not ferry_exists:
+            remarks = "Ferry data from {}/{}/{} is not available".format(year,month,cdate)
+        else:
+            try:
+                sat_df,passes = read_day(satellite,ferry)
+            except ValueError as error:
+                ## A malformed file only fails its own day
+                remarks = "The processed data from {}/{}/{} could not be read ({})".format(year,month,cdate,str(error).splitlines()[0])
+                passes = None
+            if passes is not None and not passes:
+                remarks = "The satellite did not pass over the ferry route between Vancouver and Victoria on {}-{}-{}".format(cdate,month,year)
+        if remarks is not None:
             write_log(remarks)
-            results_df=results_df.append({"Date":current_date,"Latitude":lat,"Longitude":lon,'Radius (Kms)':"-","Correlation":"-","Remarks":remarks},ignore_index=True)
-            continue
-        s.to_csv("../Processed_nc_to_csv/{}/{}/{}/sat_filtered_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate))
-        # f.to_csv("../Processed_ferry_to_csv/2018/{}/{}/ferry_filtered_2018-{}-{}.csv".format(month,cdate,month,cdate))
-        o_c,sat_oversample = oversampling(s,f)
-        s.to_csv("../Processed_nc_to_csv/{}/{}/{}/sat_oversampled_{}-{}-{}.csv".format(year,month,cdate,year,month,cdate))
+            return _log_lines,None,[{"Date":current_date,"Pass":"-","Matchups":0,"Remarks":remarks}]
+
+        ## Every ferry record is paired with the pixels of the pass in whose time-window it was recorded
+        frames = []
+        records = []
+        for start,end,rows,f in passes:
+            label = pass_label(start,end)
+            record = {"Date":current_date,"Pass":label,"Matchups":0,"Remarks":"-"}
+            records.append(record)
+            if len(passes) > 1:
+                write_log("Satellite pass {}".format(label))
+            f = f[np.isfinite(f['chl'])].reset_index(drop=True)
+            if len(f) == 0:
+                record["Remarks"] = "The ferry is not operating in the satellite pass duration"
+                write_log(record["Remarks"])
+                continue
+            ## The nearest pixels of all the ferry records of the pass are looked up at once in the spatial index of the pass
+            sat_pass = sat_df.iloc[rows]
+            with stage('matchup',rows_in=len(f)) as counts:
+                ferry_lat = f['Latitude'].to_numpy(dtype=np.float64)
+                ferry_lon = f['Longitude'].to_numpy(dtype=np.float64)
+                matched,nearest,distance,sat_chl,pixels = match_pixels(day_index(satellite,sat_pass,(start,end)),ferry_lat,ferry_lon,sat_pass['chl'].to_numpy(),max_km,box)
+                counts['rows_out'] = len(matched)
+            if len(matched) == 0:
+                record["Remarks"] = "None of the ferry records of the satellite pass lies within {} km of a satellite pixel".format(max_km)
+                write_log(record["Remarks"])
+                continue
+            f = f.iloc[matched].reset_index(drop=True)
+            pixel = sat_pass.iloc[nearest].reset_index(drop=True)
+            ferry_epoch = f['Time'].to_numpy()
+            ## The time of capture of a pixel is taken as the middle of the sensing time of its own granule
+            ## (a pass can span several consecutive granules, refer day_passes)
+            pixel_epoch = (np.asarray(pixel['starttime'],dtype=np.int64)+np.asarray(pixel['endtime'],dtype=np.int64))//2
+            matchups = pd.DataFrame({'Date':current_date,'Pass':label,
+                                     'Ferry time':pd.to_datetime(ferry_epoch,unit='s').strftime("%H:%M:%S"),
+                                     'Ferry latitude':ferry_lat[matched],'Ferry longitude':ferry_lon[matched],'Ferry chl':f['chl'].to_numpy(),
+                                     'Satellite latitude':pixel['latitude'].to_numpy(),'Satellite longitude':pixel['longitude'].to_numpy(),
+                                     'Satellite chl':sat_chl,'Pixels':pixels,'Distance (Kms)':distance,'Time offset (s)':ferry_epoch-pixel_epoch},
+                                    columns=MATCHUP_COLUMNS)
+            record.update(regression_stats(matchups['Ferry chl'],matchups['Satellite chl'],distance,matchups['Time offset (s)']))
+            write_log("{} matchups within {} km, correlation = {}".format(len(matchups),max_km,record['Correlation']))
+            frames.append(matchups)
+        return _log_lines,pd.concat(frames,ignore_index=True) if frames else None,records
+    finally:
+        _log_lines = None
+
+
+def validate_matchups(months,data_format='csv',max_km=MAX_KM,box=1,workers=1):
+    '''
+    Parameters:
+        months (list of tuples) : (year, month) of every month to validate
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+        max_km (float) : largest distance (km) between a ferry record and its nearest pixel
+        box (int) : size of the neighbourhood of pixels averaged for every ferry record (refer matchup.py)
+        workers (int) : number of worker processes validating the days
+
+    Returns:
+        matchups_df (dataframe) : matchups of every day
+        stats_df (dataframe) : regression statistics of every satellite pass, followed by the statistics of all the matchups
 
-        # o_c = undersampling(s,f)
-        #write_log(np.mean(o_c),np.std(o_c))
-        corr = np.mean(o_c)
-        results_df=results_df.append({"Date":current_date,"Latitude":lat,"Longitude":lon,'Radius (Kms)':radiusrange,"Correlation":corr,"Remarks":"-"},ignore_index=True)
+    '''
 
-        map_ferry = heatmap(s,f,lat,lon,corr,map_ferry,boat_color)
+    tasks = []
+    for year,month in months:
+        for i in range(1,32):
+            tasks.append((year,month,"{:02d}".format(i),data_format,max_km,box))
+
+    frames = []
+    records = []
+    for matchups,day_records in map_days(matchup_day,tasks,workers):
+        records.extend(day_records)
+        if matchups is not None:
+            frames.append(matchups)
+    matchups_df = pd.concat(frames,ignore_index=True) if frames else pd.DataFrame(columns=MATCHUP_COLUMNS)
+    total = {"Date":"All","Pass":"-","Remarks":"-"}
+    total.update(regression_stats(matchups_df['Ferry chl'],matchups_df['Satellite chl'],matchups_df['Distance (Kms)'],matchups_df['Time offset (s)']))
+    records.append(total)
+    return matchups_df,pd.DataFrame(records,columns=['Date','Pass']+STAT_COLUMNS+['Remarks'])
+
+
+def render_map(layers,map_ferry,boat_color,mode='markers',max_points=MAX_MAP_POINTS,cell_km=MAP_CELL_KM):
+    '''
+    Parameters:
+        layers (list of tuples) : data drawn on the map for every day with a correlation (refer validate_day)
+        map_ferry (object) : contains information for visualization of the data points on the map
+        boat_color (list of strings) : colors for the boat markers
+        mode (str) : rendering mode of the pixels (refer heatmap)
+        max_points (int) : largest number of pixels drawn for a day in the markers and heatmap modes
+        cell_km (float) : size (km) of the cells of the grid mode
+
+    Returns:
+        map_ferry (object) : contains information for visualization of the data points on the map
+
+    '''
+
+    with stage('map_render',rows_in=sum(len(layer[0]) for layer in layers)):
+        for s,lat,lon,corr in layers:
+            map_ferry = heatmap(s,None,lat,lon,corr,map_ferry,boat_color,mode,max_points,cell_km)
+        if map_ferry is not None:
+            _folium().LayerControl().add_to(map_ferry)
+    return map_ferry
+
+
+def execute(year,month,boat_color,map_ferry,radius_factor,data_format='csv',n_boot=200,seed=0,workers=1,months=None,map_mode='markers',max_points=MAX_MAP_POINTS,cell_km=MAP_CELL_KM):
+    '''
+    Parameters:
+        year (str) : desired year for validating the data
+        month (str) : desired month for validating the data
+        boat_color (list of strings) : colors for the boat markers
+        map_ferry (object) : contains information for visualization of the data points on the map
+        radius_factor (int) : parameter to increase or decrease radius around the ferry location
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+        n_boot (int) : number of bootstrap iterations used to find the correlation
+        seed (int) : seed of the random generators used for bootstrapping
+        workers (int) : number of worker processes validating the days
+        months (list of tuples) : (year, month) of every month to validate, used instead of year and month
+        map_mode (str) : rendering mode of the pixels (refer heatmap), None to skip the map
+        max_points (int) : largest number of pixels drawn for a day in the markers and heatmap modes
+        cell_km (float) : size (km) of the cells of the grid mode
+
+    Returns:
+        map_ferry (object) : contains information for visualization of the data points on the map
+        results_df (dataframe) :records of the results obtained for correlation for different instances
+
+    '''
+
+    months = [(year,month)] if months is None else months
+    records,layers = validate_days(months,[radius_factor],data_format,n_boot,seed,workers,save_filtered=True,map_layers=map_mode is not None)
+    results_df = pd.DataFrame(records,columns=RESULT_COLUMNS)
+    if map_mode is not None:
+        map_ferry = render_map(layers,map_ferry,boat_color,map_mode,max_points,cell_km)
     return map_ferry,results_df
-    
 
 
-args = get_args()
-month = args.month
-year = str(args.year)
-radius_factor = args.radius_factor
+def execute_sweep(year,month,radius_factors,data_format='csv',n_boot=200,seed=0,workers=1,months=None):
+    '''
+    Parameters:
+        year (str) : desired year for validating the data
+        month (str) : desired month for validating the data
+        radius_factors (list of floats) : parameters to increase or decrease radius around the ferry location
+        data_format (str) : 'csv' for the daily csv files or 'parquet' for the columnar store
+        n_boot (int) : number of bootstrap iterations used to find the correlation
+        seed (int) : seed of the random generators used for bootstrapping
+        workers (int) : number of worker processes validating the days
+        months (list of tuples) : (year, month) of every month to validate, used instead of year and month
+
+    Returns:
+        results_df (dataframe) : records of the results obtained for correlation for every day and radius factor
+
+    '''
+
+    months = [(year,month)] if months is None else months
+    records,_ = validate_days(months,radius_factors,data_format,n_boot,seed,workers)
+    results_df = pd.DataFrame(records,columns=SWEEP_COLUMNS)
+    return results_df.sort_values(['Radius factor','Date'],kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    '''
 
-write_log(" Experiment {} - Increasing the area of radius by a factor of {} to consider more satellite data for validation".format(str(radius_factor),str(radius_factor)))
+    Parameters:
+        argv (list of str) : command line arguments, None for the arguments of the script
+
+    Return:
+        None
+
+    '''
 
-write_log("---------------- Processing data from {}/{} -------------".format(month,year))
-map_ferry,results = execute(year,month,'blue',map_ferry,radius_factor)
-results.to_csv("Results_exp_{}/{}_{}.csv".format(month, year, str(radius_factor)))
+    pd.options.mode.chained_assignment = None
+    args = get_args(argv)
+    configure('validation',args.metrics)
+    if args.start is not None:
+        months = month_range(args.start,args.end)
+        month,year = args.start,args.end
+        period = "{} to {}".format(args.start,args.end)
+    else:
+        months = None
+        month = args.month
+        year = str(args.year)
+        period = "{}/{}".format(month,year)
+    with profiled(args.profile):
+        if args.matchup:
+            write_log(" Matchups - Pairing the ferry records with the satellite pixels within {} km ({}x{} pixels)".format(args.max_km,args.box,args.box))
+            write_log("---------------- Processing data from {} -------------".format(period))
+            matchups,stats = validate_matchups(months if months is not None else [(year,month)],args.format,args.max_km,args.box,args.workers)
+            if not os.path.isdir("Results_matchup"):
+                os.makedirs("Results_matchup")
+            matchups.to_csv("Results_matchup/{}_{}.csv".format(month, year))
+            stats.to_csv("Results_matchup/{}_{}_stats.csv".format(month, year))
+        elif args.sweep is not None:
+            write_log(" Sweep - Evaluating the radius factors {} in a single pass over the data".format(", ".join(str(x) for x in args.sweep)))
+            write_log("---------------- Processing data from {} -------------".format(period))
+            results = execute_sweep(year,month,args.sweep,args.format,args.n_boot,args.seed,args.workers,months)
+            if not os.path.isdir("Results_sweep"):
+                os.makedirs("Results_sweep")
+            results.to_csv("Results_sweep/{}_{}.csv".format(month, year))
+        else:
+            radius_factor = args.radius_factor
+
+            write_log(" Experiment {} - Increasing the area of radius by a factor of {} to consider more satellite data for validation".format(str(radius_factor),str(radius_factor)))
 
+            write_log("---------------- Processing data from {} -------------".format(period))
+            map_ferry,results = execute(year,month,'blue',None,radius_factor,args.format,args.n_boot,args.seed,args.workers,months,
+                                        None if args.no_map else args.map_mode,args.max_points,args.cell_km)
+            if not os.path.isdir("Results_exp_{}".format(month)):
+                os.makedirs("Results_exp_{}".format(month))
+            results.to_csv("Results_exp_{}/{}_{}.csv".format(month, year, str(radius_factor)))
+
+
+            if map_ferry is not None:
+                with stage('map_render'):
+                    map_ferry.save('map_exp{}.html'.format(str(radius_factor)))
+    finish()
+    return None
 
-map_ferry.save('map_exp{}.html'.format(str(radius_factor)))
 
+if __name__ == "__main__":
+    main()